@@ -3,21 +3,51 @@ Financial Advisor Agent - Main Chat Application
 """
 
 import streamlit as st
-import requests
 import re
 import uuid
 from config.config import (
     APP_NAME,
-    AGENTS_ENDPOINT,
-    TEAMS_ENDPOINT,
     AGENT_RUN_ENDPOINT,
     TEAM_RUN_ENDPOINT,
+    STREAM_RESPONSES,
+    RUN_POLL_INTERVAL,
+    COMPARE_MAX_TARGETS,
+    SESSION_CONTEXT_MODE,
+    USER_SELECTOR_PAGE_SIZE,
 )
 from utils.database import (
-    get_all_users,
-    get_user_profile,
-    format_user_profile_for_agent,
+    list_users,
+    get_profile_version,
+    get_formatted_profile,
 )
+from utils.context import (
+    ContextResult,
+    estimate_tokens,
+    get_profile_format,
+    get_profile_sections,
+    get_token_budget,
+    prefix_reuse_ratio,
+)
+from utils.prompt_pipeline import PromptState, run_pipeline
+from utils.session_context import (
+    backend_session_exists,
+    mark_session_confirmed,
+    profile_delta,
+)
+from utils.agent_runs import (
+    RunHandle,
+    submit_run,
+    cancel_run,
+    run_key,
+    completed_run,
+)
+from utils.response_cache import (
+    is_cacheable,
+    make_cache_key,
+    get_cached_response,
+    store_response,
+)
+from utils.catalog import fetch_catalog
 
 # Page configuration
 st.set_page_config(
@@ -50,6 +80,31 @@ if "active_user_id" not in st.session_state:
     st.session_state.active_user_id = None
 if "active_user_name" not in st.session_state:
     st.session_state.active_user_name = None
+if "active_run" not in st.session_state:
+    st.session_state.active_run = None  # RunHandle of the in-flight run, if any
+if "compare_targets" not in st.session_state:
+    st.session_state.compare_targets = []  # [(item_id, item_type)] picked for compare mode
+if "compare_runs" not in st.session_state:
+    st.session_state.compare_runs = []  # [{"id", "type", "handle"}] of the current comparison
+if "compare_question" not in st.session_state:
+    st.session_state.compare_question = ""
+if "last_context_report" not in st.session_state:
+    st.session_state.last_context_report = None  # What the context assembler kept/dropped
+if "history_summary" not in st.session_state:
+    st.session_state.history_summary = None  # Rolling summary of turns outside the window
+if "history_index" not in st.session_state:
+    st.session_state.history_index = None  # BM25 index over this session's messages
+if "last_prompt" not in st.session_state:
+    st.session_state.last_prompt = None  # Previous prompt sent, for prefix reuse reporting
+if "session_context" not in st.session_state:
+    st.session_state.session_context = None  # What the backend session already knows
+
+
+def cancel_active_run():
+    """Cancel the in-flight run (if any) and forget it."""
+    if st.session_state.active_run is not None:
+        cancel_run(st.session_state.active_run)
+        st.session_state.active_run = None
 
 
 def clear_session():
@@ -61,6 +116,7 @@ def clear_session():
     - User returns to home screen
     - User selects a different agent/team
     """
+    cancel_active_run()
     st.session_state.messages = []
     st.session_state.session_id = str(uuid.uuid4())
     st.session_state.chat_started = False
@@ -529,87 +585,192 @@ st.markdown(
 )
 
 
-def fetch_agents():
-    """Fetch agents from the API"""
-    try:
-        response = requests.get(AGENTS_ENDPOINT, timeout=None)
-        response.raise_for_status()
-        agents = response.json()
-        st.session_state.agents_list = agents
-        return agents
-    except requests.exceptions.RequestException:
-        return st.session_state.agents_list if st.session_state.agents_list else []
-
+def load_catalog():
+    """
+    Load the agents/teams lists into session state.
 
-def fetch_teams():
-    """Fetch teams from the API"""
-    try:
-        response = requests.get(TEAMS_ENDPOINT, timeout=None)
-        response.raise_for_status()
-        teams = response.json()
+    Lists come from the process-wide catalog cache (fetched concurrently
+    when it needs a refresh); a failed request keeps the previously
+    loaded list.
+    """
+    teams, agents = fetch_catalog()
+    if agents is not None:
+        st.session_state.agents_list = agents
+    if teams is not None:
         st.session_state.teams_list = teams
-        return teams
-    except requests.exceptions.RequestException:
-        return st.session_state.teams_list if st.session_state.teams_list else []
 
 
-def build_message_with_history(current_message: str, max_history: int = 5) -> str:
+def build_message_with_history(
+    current_message: str, target_id: str = None, max_history: int = None
+) -> str:
     """
     Build a structured message with conversation history and user profile.
 
+    Runs the target's prompt pipeline (see utils.prompt_pipeline): profile
+    fetch, profile render, history selection, compression into the token
+    budget and final layout. What was kept, dropped and how long each stage
+    took is recorded in st.session_state.last_context_report.
+
+    The rolling summary and retrieval index are kept per chat session in
+    session state, so each message is summarized or indexed only once.
+
     Args:
         current_message: The current user query
-        max_history: Maximum number of historical messages to include (default 5)
+        target_id: Agent/team ID used to pick budget, format, sections and stages
+        max_history: Optional hard cap on historical messages (None = budget only)
 
     Returns:
         Formatted string with user profile, current query and conversation history
     """
-    # Get the last N messages from history (excluding the current message we just added)
-    messages = st.session_state.messages
+    session_id = st.session_state.session_id
+    item, item_type = get_item_by_id(target_id)
+    state = PromptState(
+        current_message=current_message,
+        messages=st.session_state.messages,
+        target_id=target_id,
+        item=item,
+        item_type=item_type,
+        user_id=st.session_state.active_user_id,
+        max_history=max_history,
+    )
+
+    # Compare runs use a fixed history cap and start fresh sessions: no summary
+    if max_history is None:
+        summary = st.session_state.history_summary
+        if summary is None or summary.get("session_id") != session_id:
+            summary = {"session_id": session_id, "lines": [], "covered": 0}
+        state.summary = summary
+        index_state = st.session_state.history_index
+        if index_state is not None and index_state["session_id"] == session_id:
+            state.index = index_state["index"]
+
+    run_pipeline(state)
+
+    if max_history is None:
+        if state.summary is not None:
+            st.session_state.history_summary = {"session_id": session_id, **state.summary}
+        if state.index is not None:
+            st.session_state.history_index = {"session_id": session_id, "index": state.index}
+
+    report = state.context.report()
+    report["stages"] = state.metrics
+    st.session_state.last_context_report = report
+    return state.message
+
+
+def build_session_message(current_message: str, target_id: str, item_type: str) -> str:
+    """
+    Build the message for session context mode.
+
+    The first turn of a session (or any turn after the backend lost the
+    session) carries the full profile and history. Later turns rely on the
+    backend session memory and only carry the query, plus the changed
+    profile lines when the profile's updated_at moved, or the full profile
+    when a different profile was selected.
+
+    Args:
+        current_message: The current user query
+        target_id: Agent/team ID used to pick the token budget and profile format
+        item_type: Either "agent" or "team"
+
+    Returns:
+        The message to send
+    """
+    session_id = st.session_state.session_id
+    user_id = st.session_state.active_user_id
+    item, _ = get_item_by_id(target_id)
+    profile_text = (
+        get_formatted_profile(
+            user_id,
+            get_profile_format(target_id),
+            get_profile_sections(target_id, item, item_type),
+        )
+        if user_id
+        else ""
+    )
+    version = get_profile_version(user_id) if user_id else None
 
-    # If the current message was already added, exclude it from history
+    known = st.session_state.session_context
     if (
-        messages
-        and messages[-1].get("role") == "user"
-        and messages[-1].get("content") == current_message
+        known is None
+        or known["session_id"] != session_id
+        or not backend_session_exists(session_id, item_type)
     ):
-        history_messages = messages[:-1]
+        # New session or backend session miss: rehydrate with the full context
+        message = build_message_with_history(current_message, target_id=target_id)
     else:
-        history_messages = messages
-
-    # Get only the last max_history messages
-    history_messages = history_messages[-max_history:] if history_messages else []
+        prefix = ""
+        if user_id != known["user_id"]:
+            prefix = f"USER PROFILE:\n{profile_text}\n\n" if user_id else "USER PROFILE: none\n\n"
+        elif user_id and version != known["profile_version"]:
+            delta = profile_delta(known["profile_text"], profile_text)
+            if delta is None:
+                # Fields were removed; a delta cannot express that
+                prefix = f"USER PROFILE (replaces the previous profile):\n{profile_text}\n\n"
+            elif delta:
+                prefix = f"USER PROFILE UPDATE (changed fields):\n{delta}\n\n"
+        message = f"{prefix}CURRENT USER QUERY: {current_message}"
+        st.session_state.last_context_report = ContextResult(
+            message=message,
+            budget=get_token_budget(target_id),
+            tokens=estimate_tokens(message),
+        ).report()
+
+    st.session_state.session_context = {
+        "session_id": session_id,
+        "user_id": user_id,
+        "profile_version": version,
+        "profile_text": profile_text,
+    }
+    return message
 
-    # Build the structured message
-    structured_message = ""
 
-    # Include user profile if active user is selected
-    if st.session_state.active_user_id:
-        user_data = get_user_profile(st.session_state.active_user_id)
-        if user_data:
-            profile_text = format_user_profile_for_agent(user_data)
-            if profile_text:
-                structured_message += f"USER PROFILE:\n{profile_text}\n\n"
+def _run_endpoint(agent_id: str, item_type: str) -> str:
+    """Get the run endpoint URL for an agent or team."""
+    if item_type == "team":
+        return TEAM_RUN_ENDPOINT.format(team_id=agent_id)
+    return AGENT_RUN_ENDPOINT.format(agent_id=agent_id)
 
-    structured_message += f"CURRENT USER QUERY: {current_message}"
 
-    if history_messages:
-        structured_message += "\nHISTORY CONVERSATION:"
-        for msg in history_messages:
-            role = msg.get("role", "user")
-            # Use "you" instead of "assistant" for agent messages
-            display_role = "you" if role == "assistant" else role
-            content = msg.get("content", "")
-            structured_message += f"\n{display_role}: {content}"
+def _build_run_request(agent_id: str, message: str, item_type: str, stream: bool):
+    """Build the run endpoint URL and form data for an agent or team run."""
+    endpoint = _run_endpoint(agent_id, item_type)
 
-    return structured_message
+    if SESSION_CONTEXT_MODE:
+        # Backend session holds the conversation; send only what it lacks
+        structured_message = build_session_message(message, agent_id, item_type)
+    else:
+        # Build message with profile and as much history as the budget allows
+        structured_message = build_message_with_history(message, target_id=agent_id)
+
+    # How much of this prompt repeats the previous one to the same target,
+    # i.e. what provider-side prompt caching can reuse
+    previous = st.session_state.last_prompt
+    reuse = 0.0
+    if previous and previous["key"] == (st.session_state.session_id, agent_id):
+        reuse = prefix_reuse_ratio(previous["message"], structured_message)
+    st.session_state.last_prompt = {
+        "key": (st.session_state.session_id, agent_id),
+        "message": structured_message,
+    }
+    if st.session_state.last_context_report is not None:
+        st.session_state.last_context_report["prefix_reuse"] = reuse
+
+    form_data = {
+        "message": structured_message,
+        "stream": "true" if stream else "false",
+        "session_id": st.session_state.session_id,
+        "user_id": st.session_state.user_id,
+    }
+    return endpoint, form_data
 
 
-def send_message_to_agent(
-    agent_id: str, message: str, item_type: str = "agent"
-) -> dict:
+def start_agent_run(agent_id: str, message: str, item_type: str = "agent") -> RunHandle:
     """
-    Send a message to an agent or team and get the response.
+    Start an agent or team run in the background.
+
+    The request (profile and history included) is built here on the script
+    thread; the run itself executes on the shared run pool.
 
     Args:
         agent_id: The ID of the agent or team
@@ -617,66 +778,103 @@ def send_message_to_agent(
         item_type: Either "agent" or "team"
 
     Returns:
-        dict with 'content' and 'total_tokens' keys, or error info
+        RunHandle tracking the run
     """
-    try:
-        # Build the endpoint URL
-        if item_type == "team":
-            endpoint = TEAM_RUN_ENDPOINT.format(team_id=agent_id)
-        else:
-            endpoint = AGENT_RUN_ENDPOINT.format(agent_id=agent_id)
+    # Identical messages to the same target in this session share one run
+    dedupe_key = run_key(st.session_state.session_id, agent_id, message)
 
-        # Build message with conversation history (last 5 messages)
-        structured_message = build_message_with_history(message, max_history=5)
+    endpoint, form_data = _build_run_request(
+        agent_id, message, item_type, stream=STREAM_RESPONSES
+    )
+
+    session_id = st.session_state.session_id
+    success_hooks = []
+    if SESSION_CONTEXT_MODE:
+        # A finished run proves the backend holds the session
+        success_hooks.append(lambda result: mark_session_confirmed(session_id))
+
+    # Opt-in response cache for allowlisted agents/teams
+    if is_cacheable(agent_id):
+        profile_version = (
+            get_profile_version(st.session_state.active_user_id)
+            if st.session_state.active_user_id
+            else None
+        )
+        cache_key = make_cache_key(
+            agent_id, item_type, form_data["message"], profile_version
+        )
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            return completed_run(agent_id, item_type, cached)
+
+        success_hooks.append(lambda result: store_response(cache_key, agent_id, result))
+
+    def on_success(result):
+        for hook in success_hooks:
+            hook(result)
+
+    return submit_run(
+        agent_id,
+        item_type,
+        endpoint,
+        form_data,
+        STREAM_RESPONSES,
+        dedupe_key,
+        on_success if success_hooks else None,
+    )
 
-        # Prepare form data
+
+def start_compare(targets, message: str):
+    """
+    Send one structured message to several agents/teams concurrently.
+
+    Each target gets its own throwaway backend session so comparisons do
+    not leak into the main chat session. History is not included.
+
+    Args:
+        targets: List of (item_id, item_type) tuples (at most
+            COMPARE_MAX_TARGETS; callers warn instead of starting above it)
+        message: The question to ask every target
+    """
+    current = [(run["id"], run["type"]) for run in st.session_state.compare_runs]
+    if (
+        current == list(targets)
+        and st.session_state.compare_question == message
+        and not all(run["handle"].done for run in st.session_state.compare_runs)
+    ):
+        # Duplicate submission of the comparison already in flight
+        return
+
+    cancel_compare()
+    structured_message = build_message_with_history(message, max_history=0)
+
+    runs = []
+    for item_id, item_type in targets:
         form_data = {
             "message": structured_message,
-            "stream": "false",
-            "session_id": st.session_state.session_id,
+            "stream": "true" if STREAM_RESPONSES else "false",
+            "session_id": str(uuid.uuid4()),
             "user_id": st.session_state.user_id,
         }
-
-        # Make the request
-        response = requests.post(
-            endpoint,
-            data=form_data,
-            headers={"accept": "application/json"},
-            timeout=None,  # No timeout - wait indefinitely for response
+        handle = submit_run(
+            item_id,
+            item_type,
+            _run_endpoint(item_id, item_type),
+            form_data,
+            STREAM_RESPONSES,
         )
-        response.raise_for_status()
+        runs.append({"id": item_id, "type": item_type, "handle": handle})
 
-        result = response.json()
+    st.session_state.compare_runs = runs
+    st.session_state.compare_question = message
 
-        # Extract content and token info
-        content = result.get("content", "No response received.")
-        metrics = result.get("metrics", {})
-        total_tokens = metrics.get("total_tokens", 0)
 
-        return {
-            "success": True,
-            "content": content,
-            "total_tokens": total_tokens,
-        }
-
-    except requests.exceptions.Timeout:
-        return {
-            "success": False,
-            "content": "⏱️ Request timed out. The agent is taking too long to respond. Please try again.",
-            "total_tokens": 0,
-        }
-    except requests.exceptions.ConnectionError:
-        return {
-            "success": False,
-            "content": "🔌 Unable to connect to the backend. Please ensure the API is running at http://localhost:5111",
-            "total_tokens": 0,
-        }
-    except requests.exceptions.RequestException as e:
-        return {
-            "success": False,
-            "content": f"❌ Error communicating with the agent: {str(e)}",
-            "total_tokens": 0,
-        }
+def cancel_compare():
+    """Cancel any unfinished runs of the current comparison and leave compare mode."""
+    for run in st.session_state.compare_runs:
+        cancel_run(run["handle"])
+    st.session_state.compare_runs = []
+    st.session_state.compare_question = ""
 
 
 def get_item_by_id(item_id):
@@ -703,9 +901,36 @@ def parse_agent_from_message(message):
     return None, message
 
 
+def parse_compare_mentions(message):
+    """
+    Parse leading @mentions from a message.
+
+    "@tax-agent @advisor-team How should I save tax?" returns
+    (["tax-agent", "advisor-team"], "How should I save tax?").
+    """
+    match = re.match(r"^((?:@[\w-]+[\s,]*)+)(.*)$", message.strip(), re.DOTALL)
+    if not match:
+        return [], message
+    ids = re.findall(r"@([\w-]+)", match.group(1))
+    # Preserve order, drop duplicates
+    ids = list(dict.fromkeys(ids))
+    return ids, match.group(2).strip()
+
+
 def render_user_selector():
     """Render user selection component."""
-    users = get_all_users()
+    search = st.text_input(
+        "Search users",
+        key="user_search",
+        placeholder="🔍 Search by name or ID",
+        label_visibility="collapsed",
+    ).strip()
+    users, more = list_users(USER_SELECTOR_PAGE_SIZE, search=search or None)
+
+    # Keep the active user selectable even when the search doesn't match it
+    active_id = st.session_state.active_user_id
+    if active_id and all(u["user_id"] != active_id for u in users):
+        users = [{"user_id": active_id, "name": st.session_state.active_user_name}] + users
 
     # Create user options
     user_options = ["👤 No User Selected"] + [
@@ -735,6 +960,12 @@ def render_user_selector():
         if st.button("👤 Profile", key="goto_profile", use_container_width=True):
             st.switch_page("pages/2_User_Profile.py")
 
+    if more:
+        st.caption(
+            f"Showing the {USER_SELECTOR_PAGE_SIZE} most recently updated matches; "
+            "refine the search to find others."
+        )
+
     # Update session state based on selection
     if selected == "👤 No User Selected":
         if st.session_state.active_user_id is not None:
@@ -776,7 +1007,7 @@ def render_user_selector():
         )
 
 
-def render_message(role, content, responder_name=None, total_tokens=None):
+def render_message(role, content, responder_name=None, total_tokens=None, cached=False):
     """Render a chat message"""
     if role == "user":
         st.markdown(
@@ -804,18 +1035,104 @@ def render_message(role, content, responder_name=None, total_tokens=None):
         )
 
         # Render token info if available
-        if total_tokens and total_tokens > 0:
+        if cached:
+            tokens_label = f" • saved {total_tokens:,} tokens" if total_tokens else ""
+            st.markdown(
+                f'<div class="token-info">⚡ cached{tokens_label}</div>',
+                unsafe_allow_html=True,
+            )
+        elif total_tokens and total_tokens > 0:
             st.markdown(
                 f'<div class="token-info">tokens: {total_tokens:,}</div>',
                 unsafe_allow_html=True,
             )
 
 
+def submit_user_message(agent_id: str, message: str, item_type: str):
+    """Record the user's message and start the run in the background."""
+    handle = st.session_state.active_run
+    if (
+        handle is not None
+        and not handle.done
+        and handle.dedupe_key == run_key(st.session_state.session_id, agent_id, message)
+    ):
+        # Duplicate submission of the message already in flight
+        return
+
+    cancel_active_run()
+    st.session_state.messages.append({"role": "user", "content": message})
+    st.session_state.active_run = start_agent_run(agent_id, message, item_type)
+
+
+def finish_active_run():
+    """Move the finished run's result into the chat history."""
+    handle = st.session_state.active_run
+    st.session_state.active_run = None
+    if handle is None or handle.result is None:
+        return
+    st.session_state.messages.append(
+        {
+            "role": "assistant",
+            "content": handle.result["content"],
+            "total_tokens": handle.result["total_tokens"],
+            "cached": handle.result.get("cached", False),
+        }
+    )
+
+
+@st.fragment(run_every=RUN_POLL_INTERVAL)
+def render_active_run(responder_name):
+    """
+    Poll the in-flight run and render its partial output.
+
+    Runs as a fragment so only this block refreshes while the run is in
+    flight; the full page reruns once the run has finished.
+    """
+    handle = st.session_state.active_run
+    if handle is None:
+        return
+    if handle.done:
+        finish_active_run()
+        st.rerun()
+
+    header = responder_name or "Assistant"
+    st.markdown(
+        f'<div class="message-header">🤖 {header}</div>',
+        unsafe_allow_html=True,
+    )
+    st.markdown(
+        f'<div class="assistant-message-wrapper">{handle.content or "🤔 Thinking..."}</div>',
+        unsafe_allow_html=True,
+    )
+
+    report = st.session_state.last_context_report
+    if report:
+        dropped = f" • dropped {', '.join(report['dropped'])}" if report["dropped"] else ""
+        summarized = " • older turns summarized" if report["summary_included"] else ""
+        reuse = report.get("prefix_reuse")
+        reused = f" • {reuse:.0%} prefix reuse" if reuse else ""
+        st.markdown(
+            f'<div class="token-info">context: ~{report["tokens"]:,} / {report["budget"]:,} tokens{reused}{summarized}{dropped}</div>',
+            unsafe_allow_html=True,
+        )
+        if report.get("stages"):
+            stages = " • ".join(
+                f'{m["stage"]} {m["ms"]:.1f}ms/{m["chars"]:,}ch' for m in report["stages"]
+            )
+            st.markdown(f'<div class="token-info">prompt: {stages}</div>', unsafe_allow_html=True)
+
+    if st.button("⏹️ Stop", key=f"stop_run_{handle.handle_id}"):
+        cancel_run(handle)
+        finish_active_run()
+        st.rerun()
+
+
 def clear_chat_messages():
     """
     Clear chat messages but keep the current agent selected.
     Generates a new session_id for fresh context.
     """
+    cancel_active_run()
     st.session_state.messages = []
     st.session_state.session_id = str(uuid.uuid4())
 
@@ -872,43 +1189,118 @@ def render_chat_view():
                 msg["content"],
                 item_name if msg["role"] == "assistant" else None,
                 msg.get("total_tokens") if msg["role"] == "assistant" else None,
+                msg.get("cached", False),
             )
 
+        # In-flight run (polled in the background, cancellable)
+        if st.session_state.active_run is not None:
+            render_active_run(item_name)
+
     # Chat input - uses st.chat_input for Enter key support and auto-clear
     st.markdown("---")
 
     user_input = st.chat_input("Type your message...", key="chat_input")
 
     if user_input:
-        # Add user message to state
-        st.session_state.messages.append({"role": "user", "content": user_input})
-
-        # Show user message immediately
-        render_message("user", user_input)
-
-        # Show thinking indicator and call the backend
-        with st.spinner("🤔 Thinking..."):
-            response = send_message_to_agent(
-                st.session_state.selected_agent_id,
-                user_input,
-                st.session_state.selected_type or "agent",
-            )
+        # Start the run in the background; the rerun picks up its progress
+        submit_user_message(
+            st.session_state.selected_agent_id,
+            user_input,
+            st.session_state.selected_type or "agent",
+        )
+        st.rerun()
+
+
+def render_compare_results(runs):
+    """Render comparison answers side by side with latency and token counts."""
+    for i in range(0, len(runs), 3):
+        row_runs = runs[i : i + 3]
+        cols = st.columns(3)
+        for j, run in enumerate(row_runs):
+            handle = run["handle"]
+            item, _ = get_item_by_id(run["id"])
+            name = item.get("name", run["id"]) if item else run["id"]
+            tag_class = "team-tag" if run["type"] == "team" else "agent-tag"
+
+            if handle.done:
+                content = handle.result["content"]
+                stats = f"⏱️ {handle.elapsed:.1f}s • tokens: {handle.result['total_tokens']:,}"
+            else:
+                content = handle.content or "🤔 Thinking..."
+                stats = f"⏳ {handle.elapsed:.1f}s"
+
+            with cols[j]:
+                st.markdown(
+                    f'<div class="message-header"><span class="{tag_class}">@{run["id"]}</span> {name}</div>',
+                    unsafe_allow_html=True,
+                )
+                st.markdown(
+                    f'<div class="assistant-message-wrapper">{content}</div>',
+                    unsafe_allow_html=True,
+                )
+                st.markdown(
+                    f'<div class="token-info">{stats}</div>',
+                    unsafe_allow_html=True,
+                )
+
+
+@st.fragment(run_every=RUN_POLL_INTERVAL)
+def render_compare_progress():
+    """Poll the comparison runs; rerun the full page once all have finished."""
+    runs = st.session_state.compare_runs
+    if runs and all(run["handle"].done for run in runs):
+        st.rerun()
+    render_compare_results(runs)
+
 
-        # Add agent response
-        st.session_state.messages.append(
-            {
-                "role": "assistant",
-                "content": response["content"],
-                "total_tokens": response["total_tokens"],
-            }
+def render_compare_view():
+    """Render compare mode: one question, several agents/teams answering side by side"""
+    runs = st.session_state.compare_runs
+    all_done = all(run["handle"].done for run in runs)
+
+    col1, col2, col3 = st.columns([1, 4, 1])
+
+    with col1:
+        if st.button("← Back", key="compare_back"):
+            cancel_compare()
+            st.rerun()
+
+    with col2:
+        st.markdown(
+            f"""
+        <div style="text-align: center; color: #f1f5f9; font-family: 'DM Sans', sans-serif; font-size: 1.1rem;">
+            ⚖️ Comparing {len(runs)} agents
+        </div>
+        """,
+            unsafe_allow_html=True,
         )
 
-        # Show agent response immediately
-        render_message(
-            "assistant", response["content"], item_name, response["total_tokens"]
+    with col3:
+        if not all_done and st.button("⏹️ Stop", key="compare_stop"):
+            for run in runs:
+                cancel_run(run["handle"])
+            st.rerun()
+
+    st.markdown("---")
+    render_message("user", st.session_state.compare_question)
+
+    if all_done:
+        wall_time = max(run["handle"].elapsed for run in runs)
+        total_tokens = sum(run["handle"].result["total_tokens"] for run in runs)
+        st.markdown(
+            f'<div class="token-info">wall time: {wall_time:.1f}s • total tokens: {total_tokens:,}</div>',
+            unsafe_allow_html=True,
         )
+        render_compare_results(runs)
+    else:
+        render_compare_progress()
 
-        # Rerun to clean up state
+    st.markdown("---")
+
+    # Follow-up question goes to the same set of agents
+    user_input = st.chat_input("Ask all of them again...", key="compare_input")
+    if user_input:
+        start_compare([(run["id"], run["type"]) for run in runs], user_input)
         st.rerun()
 
 
@@ -930,11 +1322,8 @@ def render_home_view():
         unsafe_allow_html=True,
     )
 
-    # Fetch data if not loaded
-    if not st.session_state.agents_list:
-        fetch_agents()
-    if not st.session_state.teams_list:
-        fetch_teams()
+    # Sync catalog from the shared cache (cheap when it is fresh)
+    load_catalog()
 
     # Wider center column for chat input
     col1, col2, col3 = st.columns([1, 4, 1])
@@ -945,8 +1334,30 @@ def render_home_view():
 
         st.markdown("<div style='height: 1rem;'></div>", unsafe_allow_html=True)
 
+        # Show compare targets picked in the Library ABOVE the input
+        if st.session_state.compare_targets:
+            label_col, clear_col = st.columns([8, 1])
+            with label_col:
+                pills = "".join(
+                    f'<span class="{"team-pill" if t == "team" else "agent-pill"}">@{i}</span>'
+                    for i, t in st.session_state.compare_targets
+                )
+                st.markdown(
+                    f"""
+                    <div class="selected-agent-label">
+                        {pills}
+                        <span class="type-badge">compare</span>
+                    </div>
+                    """,
+                    unsafe_allow_html=True,
+                )
+            with clear_col:
+                if st.button("✕", key="clear_compare", help="Clear comparison"):
+                    st.session_state.compare_targets = []
+                    st.rerun()
+
         # Show selected item label ABOVE the input
-        if st.session_state.selected_agent_id:
+        elif st.session_state.selected_agent_id:
             item, item_type = get_item_by_id(st.session_state.selected_agent_id)
             item_name = item.get("name", "") if item else ""
             pill_class = "team-pill" if item_type == "team" else "agent-pill"
@@ -976,17 +1387,52 @@ def render_home_view():
             st.session_state.search_term = ""
 
         # Chat input
-        placeholder = (
-            "Type your message..."
-            if st.session_state.selected_agent_id
-            else "Type @name to search or @agent-id message to send"
-        )
+        if st.session_state.compare_targets:
+            placeholder = "Ask all selected agents..."
+        elif st.session_state.selected_agent_id:
+            placeholder = "Type your message..."
+        else:
+            placeholder = "Type @name to search, @agent-id message to send, or @a @b message to compare"
 
         user_input = st.chat_input(placeholder, key="home_chat_input")
 
         # Handle input
         if user_input:
-            if st.session_state.selected_agent_id:
+            mention_ids, mention_message = parse_compare_mentions(user_input)
+
+            if len(st.session_state.compare_targets) > COMPARE_MAX_TARGETS:
+                st.warning(
+                    f"Compare supports up to {COMPARE_MAX_TARGETS} agents/teams at once; "
+                    "clear the selection and pick fewer in the Library."
+                )
+            elif st.session_state.compare_targets:
+                # Targets picked in the Library - fan the question out
+                start_compare(st.session_state.compare_targets, user_input)
+                st.session_state.compare_targets = []
+                st.rerun()
+            elif len(mention_ids) > 1 and mention_message:
+                # Several @mentions - compare mode
+                targets = []
+                for mention_id in mention_ids:
+                    item, item_type = get_item_by_id(mention_id)
+                    if item:
+                        targets.append((mention_id, item_type))
+                unknown = [i for i in mention_ids if i not in dict(targets)]
+                if len(targets) > COMPARE_MAX_TARGETS:
+                    st.warning(
+                        f"Compare supports up to {COMPARE_MAX_TARGETS} agents/teams at once "
+                        f"({len(targets)} mentioned)"
+                    )
+                elif len(targets) > 1 and not unknown:
+                    start_compare(targets, mention_message)
+                    st.session_state.search_term = ""
+                    st.rerun()
+                else:
+                    st.warning(
+                        "Compare needs at least two known agents/teams"
+                        + (f" (not found: {', '.join('@' + i for i in unknown)})" if unknown else "")
+                    )
+            elif st.session_state.selected_agent_id:
                 # Check if agent changed - clear session if different agent selected
                 if (
                     st.session_state.current_agent_for_session
@@ -998,23 +1444,10 @@ def render_home_view():
                     )
 
                 # Agent already selected - send message directly
-                st.session_state.messages.append(
-                    {"role": "user", "content": user_input}
-                )
-
-                with st.spinner("🤔 Thinking..."):
-                    response = send_message_to_agent(
-                        st.session_state.selected_agent_id,
-                        user_input,
-                        st.session_state.selected_type or "agent",
-                    )
-
-                st.session_state.messages.append(
-                    {
-                        "role": "assistant",
-                        "content": response["content"],
-                        "total_tokens": response["total_tokens"],
-                    }
+                submit_user_message(
+                    st.session_state.selected_agent_id,
+                    user_input,
+                    st.session_state.selected_type or "agent",
                 )
                 st.session_state.chat_started = True
                 st.rerun()
@@ -1032,22 +1465,7 @@ def render_home_view():
                         st.session_state.selected_agent_id = item_id
                         st.session_state.selected_type = item_type
                         st.session_state.current_agent_for_session = item_id
-                        st.session_state.messages.append(
-                            {"role": "user", "content": message}
-                        )
-
-                        with st.spinner("🤔 Thinking..."):
-                            response = send_message_to_agent(
-                                item_id, message, item_type
-                            )
-
-                        st.session_state.messages.append(
-                            {
-                                "role": "assistant",
-                                "content": response["content"],
-                                "total_tokens": response["total_tokens"],
-                            }
-                        )
+                        submit_user_message(item_id, message, item_type)
                         st.session_state.chat_started = True
                         st.session_state.search_term = ""
                         st.rerun()
@@ -1142,7 +1560,9 @@ def render_home_view():
 
 
 def main():
-    if st.session_state.chat_started and st.session_state.selected_agent_id:
+    if st.session_state.compare_runs:
+        render_compare_view()
+    elif st.session_state.chat_started and st.session_state.selected_agent_id:
         render_chat_view()
     else:
         render_home_view()
@@ -16,3 +16,114 @@ TEAMS_ENDPOINT = f"{API_BASE_URL}/teams"
 # Agent/Team run endpoints (use .format(agent_id=...) or .format(team_id=...))
 AGENT_RUN_ENDPOINT = f"{API_BASE_URL}/agents/{{agent_id}}/runs"
 TEAM_RUN_ENDPOINT = f"{API_BASE_URL}/teams/{{team_id}}/runs"
+
+# Run cancel endpoints (use .format(agent_id=..., run_id=...) or .format(team_id=..., run_id=...))
+AGENT_CANCEL_ENDPOINT = f"{API_BASE_URL}/agents/{{agent_id}}/runs/{{run_id}}/cancel"
+TEAM_CANCEL_ENDPOINT = f"{API_BASE_URL}/teams/{{team_id}}/runs/{{run_id}}/cancel"
+
+# Backend session lookup (use .format(session_id=...))
+SESSION_ENDPOINT = f"{API_BASE_URL}/sessions/{{session_id}}"
+
+# HTTP connection pooling (shared by all sessions in the process)
+HTTP_POOL_CONNECTIONS = 4  # Number of backend hosts to keep pools for
+HTTP_POOL_MAXSIZE = 32  # Max keep-alive connections per backend host
+
+# Stream agent/team responses token-by-token instead of waiting for the full run
+STREAM_RESPONSES = True
+
+# Worker threads used to fetch the agents and teams catalogs concurrently
+CATALOG_FETCH_WORKERS = 8
+
+# Shared catalog cache (seconds)
+CATALOG_CACHE_TTL = 60  # Serve cached /agents and /teams without revalidating
+CATALOG_STALE_TTL = 600  # Beyond the TTL, serve stale data while refreshing in background
+
+# Backend timeout budgets in seconds, as (connect, read) tuples
+CATALOG_TIMEOUT = (3.05, 15)
+RUN_TIMEOUT = (3.05, 120)  # Read = longest silence allowed between streamed chunks
+RUN_TOTAL_TIMEOUT = 300  # Hard cap on a whole agent/team run
+
+# Retries for idempotent GETs (jittered exponential backoff, seconds)
+GET_MAX_RETRIES = 2
+RETRY_BACKOFF_BASE = 0.25
+RETRY_BACKOFF_MAX = 4.0
+
+# Circuit breaker: open after N consecutive failures, probe again after reset timeout
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 30
+
+# Background run execution
+RUN_EXECUTOR_WORKERS = 16  # Concurrent agent/team runs across all sessions
+RUN_QUEUE_LIMIT = 64  # Max submitted-but-unfinished runs before new ones are rejected
+RUN_POLL_INTERVAL = 0.5  # Seconds between UI refreshes while a run is in flight
+
+# Compare mode: max agents/teams a single question can be fanned out to
+COMPARE_MAX_TARGETS = 6
+
+# User selectors show this many matches for the search text (most recent first)
+USER_SELECTOR_PAGE_SIZE = 20
+
+# Response cache for repeatable queries (opt-in, per agent/team allowlist)
+RESPONSE_CACHE_ENABLED = False
+RESPONSE_CACHE_ALLOWLIST = set()  # Agent/team IDs whose answers may be cached
+RESPONSE_CACHE_TTL = 24 * 60 * 60  # Seconds
+RESPONSE_CACHE_MAX_ENTRIES = 1000  # Least recently used entries are evicted beyond this
+
+# Prompt context budget (estimated tokens for profile + query + history)
+CONTEXT_TOKEN_BUDGET = 6000
+CONTEXT_TOKEN_BUDGETS = {}  # Per agent/team overrides, e.g. {"market-intelligence-agent": 3000}
+SUMMARY_TOKEN_BUDGET = 600  # Cap on the rolling summary of turns outside the history window
+
+# Server-side session context: send the profile once per session, then only
+# profile deltas and the new query; conversation memory lives in the backend session
+SESSION_CONTEXT_MODE = False
+SESSION_CHECK_TIMEOUT = (1.0, 2.0)  # (connect, read) seconds for the session-exists check
+SESSION_CHECK_TTL = 120  # Seconds a confirmed backend session is trusted without rechecking
+
+# Profile text encoding sent to agents: "verbose" (readable sections) or
+# "compact" (terse key=value lines, zero/empty fields dropped)
+PROFILE_FORMAT = "verbose"
+PROFILE_FORMATS = {}  # Per agent/team overrides, e.g. {"tax-compliance-specialist": "compact"}
+
+# Prompt layout: "query_first" (profile, query, history) or "prefix_stable"
+# (profile, history, query - keeps earlier turns a byte-identical prefix for
+# provider-side prompt caching)
+CONTEXT_LAYOUT = "query_first"
+CONTEXT_LAYOUTS = {}  # Per agent/team overrides
+
+# History selection: "window" (newest turns that fit, older ones summarized) or
+# "retrieval" (newest turns plus earlier turns relevant to the query, via BM25)
+HISTORY_MODE = "window"
+HISTORY_MODES = {}  # Per agent/team overrides
+HISTORY_RECENT_MESSAGES = 4  # Trailing messages always kept in retrieval mode
+HISTORY_RETRIEVAL_TOP_K = 4  # Earlier messages retrieved by relevance (turn partners come along)
+
+# Profile section routing: which profile sections each agent receives.
+# Explicit entries win ("all" = full profile); otherwise sections are derived
+# from the agent's catalog tool names. Teams (incl. the meta-team) and agents
+# with no recognised tools get the full profile.
+PROFILE_SECTIONS = {}  # e.g. {"market-intelligence-agent": ["personal", "savings"]}
+PROFILE_ALWAYS_SECTIONS = ["personal", "additional_info"]
+PROFILE_SECTION_RULES = {  # Regex on tool names -> sections the tool needs
+    r"insurance|cover|term_plan": ["income", "expenses", "insurance"],
+    r"emergency": ["income", "expenses", "savings"],
+    r"spending|budget|expense|savings_rate": ["income", "expenses", "savings"],
+    r"rent|emi|real_estate|property|home|debt|foir": ["income", "expenses", "real_estate"],
+    r"retirement|epf|vpf|nps": ["income", "savings", "goals"],
+    r"tax|80c|80d|80ccd|hra|lta|section_24|regime": ["income", "insurance", "tax", "real_estate"],
+    r"capital_gains": ["savings"],
+    r"stock|index|market|news|analyst": ["savings"],
+    r"sip|goal|corpus|inflation": ["income", "savings", "goals"],
+    r"portfolio|allocation|rebalanc": ["savings", "goals"],
+}
+
+# Prompt assembly stages, run in order (see utils/prompt_pipeline.py).
+# Leave a stage out to skip it, e.g. no history for a stateless agent.
+PROMPT_PIPELINE = [
+    "profile_fetch",
+    "profile_render",
+    "history_selection",
+    "compression",
+    "layout",
+]
+PROMPT_PIPELINES = {}  # Per agent/team overrides
@@ -3,10 +3,10 @@ Agents Library Page - View all available agents and teams
 """
 
 import streamlit as st
-import requests
 import json
 import uuid
-from config.config import APP_NAME, AGENTS_ENDPOINT, TEAMS_ENDPOINT
+from config.config import APP_NAME, COMPARE_MAX_TARGETS
+from utils.catalog import fetch_catalog
 
 # Page configuration
 st.set_page_config(
@@ -237,26 +237,6 @@ st.markdown(
 )
 
 
-def fetch_agents():
-    """Fetch agents from the API"""
-    try:
-        response = requests.get(AGENTS_ENDPOINT, timeout=None)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return None
-
-
-def fetch_teams():
-    """Fetch teams from the API"""
-    try:
-        response = requests.get(TEAMS_ENDPOINT, timeout=None)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return None
-
-
 def extract_description(item):
     """Extract a short description from the item"""
     # First check for direct description field (teams have this)
@@ -474,6 +454,8 @@ def render_team_card(team, col):
             ):
                 st.session_state[f"show_details_team_{team_id}"] = True
 
+        st.checkbox("⚖️ Compare", key=f"compare_team_{team_id}")
+
         # Show dialogs
         if st.session_state.get(f"show_config_team_{team_id}", False):
             show_config_dialog(team, team_id, "team")
@@ -536,6 +518,8 @@ def render_agent_card(agent, col):
             ):
                 st.session_state[f"show_details_agent_{agent_id}"] = True
 
+        st.checkbox("⚖️ Compare", key=f"compare_agent_{agent_id}")
+
         # Show dialogs
         if st.session_state.get(f"show_config_agent_{agent_id}", False):
             show_config_dialog(agent, agent_id, "agent")
@@ -561,8 +545,7 @@ def main():
 
     # Fetch data
     with st.spinner("Loading..."):
-        teams = fetch_teams()
-        agents = fetch_agents()
+        teams, agents = fetch_catalog()
 
     if teams is None and agents is None:
         st.markdown(
@@ -585,6 +568,39 @@ def main():
     st.session_state["teams_list"] = teams or []
     st.session_state["agents_list"] = agents or []
 
+    # === COMPARE BAR ===
+    compare_targets = [
+        (team.get("id"), "team")
+        for team in teams or []
+        if st.session_state.get(f"compare_team_{team.get('id')}", False)
+    ] + [
+        (agent.get("id"), "agent")
+        for agent in agents or []
+        if st.session_state.get(f"compare_agent_{agent.get('id')}", False)
+    ]
+    if compare_targets:
+        too_many = len(compare_targets) > COMPARE_MAX_TARGETS
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col2:
+            if too_many:
+                st.warning(
+                    f"Compare supports up to {COMPARE_MAX_TARGETS} teams/agents at once; "
+                    f"deselect {len(compare_targets) - COMPARE_MAX_TARGETS}."
+                )
+            if st.button(
+                f"⚖️ Compare {len(compare_targets)} selected",
+                key="start_compare",
+                use_container_width=True,
+                disabled=len(compare_targets) < 2 or too_many,
+                help=f"Select two to {COMPARE_MAX_TARGETS} teams or agents to ask them the same question",
+            ):
+                st.session_state["compare_targets"] = compare_targets
+                st.session_state["selected_agent_id"] = None
+                st.session_state["selected_type"] = None
+                st.session_state["chat_started"] = False
+                st.switch_page("app.py")
+        st.markdown("<br>", unsafe_allow_html=True)
+
     # === TEAMS SECTION ===
     if teams:
         st.markdown(
@@ -5,13 +5,14 @@ Collects comprehensive financial data for personalized advice.
 
 import streamlit as st
 import uuid
-from config.config import APP_NAME
+from config.config import APP_NAME, USER_SELECTOR_PAGE_SIZE
 from utils.database import (
     save_user_profile,
     get_user_profile,
-    get_all_users,
+    list_users,
     delete_user,
 )
+from utils.profile_metrics import compute_derived_metrics
 
 # Page configuration
 st.set_page_config(
@@ -501,11 +502,16 @@ def render_user_selector():
         unsafe_allow_html=True,
     )
     
-    users = get_all_users()
-    
     col1, col2, col3 = st.columns([2, 1, 1])
     
     with col1:
+        search = st.text_input(
+            "Search users",
+            key="profile_user_search",
+            placeholder="🔍 Search by name or ID",
+            label_visibility="collapsed",
+        ).strip()
+        users, more = list_users(USER_SELECTOR_PAGE_SIZE, search=search or None)
         user_options = ["➕ Create New User"] + [
             f"{u['name']} ({u['user_id']})" for u in users
         ]
@@ -515,6 +521,11 @@ def render_user_selector():
             key="user_selector",
             label_visibility="collapsed",
         )
+        if more:
+            st.caption(
+                f"Showing the {USER_SELECTOR_PAGE_SIZE} most recently updated matches; "
+                "refine the search to find others."
+            )
     
     with col2:
         if selected != "➕ Create New User":
@@ -647,7 +658,7 @@ def render_income_section():
         )
 
 
-def render_expenses_section():
+def render_expenses_section(derived):
     """Render monthly expenses section."""
     st.markdown(
         '<div class="section-header">📊 Monthly Expenses</div>',
@@ -723,20 +734,8 @@ def render_expenses_section():
         )
     
     # Total expenses summary
-    total_expenses = sum([
-        st.session_state.form_exp_housing,
-        st.session_state.form_exp_food,
-        st.session_state.form_exp_transportation,
-        st.session_state.form_exp_utilities,
-        st.session_state.form_exp_healthcare,
-        st.session_state.form_exp_education,
-        st.session_state.form_exp_entertainment,
-        st.session_state.form_exp_emi,
-        st.session_state.form_exp_other,
-    ])
-    
-    income = st.session_state.form_monthly_income
-    savings_rate = ((income - total_expenses) / income * 100) if income > 0 else 0
+    total_expenses = derived["total_monthly_expenses"]
+    savings_rate = derived["savings_rate_pct"] or 0
     
     st.markdown(
         f"""
@@ -755,7 +754,7 @@ def render_expenses_section():
     )
 
 
-def render_insurance_section():
+def render_insurance_section(derived):
     """Render insurance coverage section."""
     st.markdown(
         '<div class="section-header">🛡️ Insurance Coverage</div>',
@@ -805,12 +804,11 @@ def render_insurance_section():
         )
     
     # Insurance adequacy check
-    annual_income = st.session_state.form_monthly_income * 12
-    total_life_cover = st.session_state.form_life_insurance + st.session_state.form_term_insurance
-    recommended_cover = annual_income * 15  # 15x rule
+    total_life_cover = derived["total_life_cover"]
+    recommended_cover = derived["recommended_life_cover"]  # 15x rule
+    coverage_ratio = derived["life_cover_pct_of_recommended"]
     
-    if annual_income > 0:
-        coverage_ratio = total_life_cover / recommended_cover * 100
+    if coverage_ratio is not None:
         st.markdown(
             f"""
             <div class="info-card">
@@ -824,7 +822,7 @@ def render_insurance_section():
         )
 
 
-def render_savings_section():
+def render_savings_section(derived):
     """Render savings and investments section."""
     st.markdown(
         '<div class="section-header">💵 Savings & Investments</div>',
@@ -912,18 +910,7 @@ def render_savings_section():
         )
     
     # Total portfolio value
-    total_portfolio = sum([
-        st.session_state.form_emergency_fund,
-        st.session_state.form_fixed_deposits,
-        st.session_state.form_mutual_funds,
-        st.session_state.form_stocks,
-        st.session_state.form_ppf,
-        st.session_state.form_nps,
-        st.session_state.form_epf,
-        st.session_state.form_gold,
-        st.session_state.form_real_estate_value,
-        st.session_state.form_other_investments,
-    ])
+    total_portfolio = derived["total_portfolio"]
     
     st.markdown(
         f"""
@@ -936,7 +923,7 @@ def render_savings_section():
     )
 
 
-def render_tax_section():
+def render_tax_section(derived):
     """Render tax planning section (80C, 80D, 80CCD)."""
     st.markdown(
         '<div class="section-header">📑 Tax Planning</div>',
@@ -998,18 +985,9 @@ def render_tax_section():
                 key="form_sukanya_samriddhi",
             )
         
-        total_80c = sum([
-            st.session_state.form_ppf_contribution,
-            st.session_state.form_elss_investment,
-            st.session_state.form_life_premium_80c,
-            st.session_state.form_epf_contribution,
-            st.session_state.form_home_loan_principal,
-            st.session_state.form_children_tuition,
-            st.session_state.form_sukanya_samriddhi,
-        ])
-        
-        utilized = min(total_80c, 150000)
-        remaining = max(0, 150000 - total_80c)
+        total_80c = derived["total_80c"]
+        utilized = derived["claimed_80c"]
+        remaining = derived["remaining_80c"]
         
         st.progress(min(total_80c / 150000, 1.0))
         st.markdown(
@@ -1072,7 +1050,7 @@ def render_tax_section():
             )
 
 
-def render_real_estate_section():
+def render_real_estate_section(derived):
     """Render real estate section."""
     st.markdown(
         '<div class="section-header">🏠 Real Estate & Home Planning</div>',
@@ -1138,12 +1116,10 @@ def render_real_estate_section():
             )
     
     # FOIR Analysis
-    monthly_income = st.session_state.form_monthly_income
-    total_emi = st.session_state.form_exp_emi + st.session_state.form_home_loan_emi
+    foir = derived["foir_pct"]
     
-    if monthly_income > 0:
-        foir = total_emi / monthly_income * 100
-        max_affordable_emi = monthly_income * 0.4  # 40% FOIR rule
+    if foir is not None:
+        max_affordable_emi = derived["max_affordable_emi"]  # 40% FOIR rule
         
         st.markdown(
             f"""
@@ -1255,14 +1231,17 @@ def main():
     
     st.markdown("---")
     
+    # Totals and ratios for the summary cards, computed once per rerun
+    derived = compute_derived_metrics(collect_form_data())
+    
     # Form sections
     render_personal_section()
     render_income_section()
-    render_expenses_section()
-    render_insurance_section()
-    render_savings_section()
-    render_tax_section()
-    render_real_estate_section()
+    render_expenses_section(derived)
+    render_insurance_section(derived)
+    render_savings_section(derived)
+    render_tax_section(derived)
+    render_real_estate_section(derived)
     render_goals_section()
     render_additional_section()
     
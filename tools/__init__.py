@@ -0,0 +1,6 @@
+"""
+Developer Tools
+
+This package contains standalone scripts for local development,
+benchmarking and maintenance. They are not imported by the app.
+"""
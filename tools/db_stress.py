@@ -0,0 +1,138 @@
+"""
+DB Stress - Hammer the profile database from concurrent readers and writers.
+
+Runs writer threads saving profiles and reader threads loading them against
+a scratch database in a temporary directory (data/users.db is never
+opened, not even by the import-time schema setup), then reports
+failed operations and latency percentiles per operation type. Writes that
+fail show up as "Failed to save profile" in the app, so the expected result
+is zero failures.
+
+Usage:
+    python -m tools.db_stress
+    python -m tools.db_stress --writers 8 --readers 16 --seconds 10
+    python -m tools.db_stress --no-pragmas    # Default rollback journal, no busy timeout
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+SAMPLE_PROFILE = {
+    "personal": {"age": 34, "city": "Pune", "occupation": "Engineer"},
+    "income": {"monthly_income": 150000, "annual_income": 1800000},
+    "expenses": {"housing": 30000, "food": 12000, "emi_payments": 15000},
+    "savings": {"emergency_fund": 300000, "mutual_funds": 800000},
+}
+
+
+def run(database, args, results, errors, first_errors):
+    stop = time.monotonic() + args.seconds
+    user_ids = [f"stress_{i}" for i in range(args.users)]
+
+    def record(op, fn):
+        started = time.perf_counter()
+        try:
+            ok = fn()
+        except Exception as e:
+            ok = False
+            first_errors.setdefault(op, repr(e))
+        results[op].append((time.perf_counter() - started) * 1000)
+        if not ok:
+            errors[op] += 1
+
+    # Reads go straight to the pool: the public read functions swallow
+    # errors into None/[], which would hide a locked database
+    def load(user_id):
+        with database.get_connection() as conn:
+            row = conn.execute(
+                "SELECT profile_data FROM users WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        if row is not None:
+            json.loads(row["profile_data"])
+        return True
+
+    def list_page():
+        with database.get_connection() as conn:
+            conn.execute("""
+                SELECT user_id, name, updated_at FROM users
+                ORDER BY updated_at DESC, user_id DESC
+                LIMIT 20
+            """).fetchall()
+        return True
+
+    def writer():
+        while time.monotonic() < stop:
+            user_id = random.choice(user_ids)
+            profile = dict(SAMPLE_PROFILE, income={"monthly_income": random.randint(1, 10**6)})
+            record("save", lambda: database.save_user_profile(user_id, user_id, profile))
+
+    def reader():
+        while time.monotonic() < stop:
+            if random.random() < 0.2:
+                record("list", list_page)
+            else:
+                user_id = random.choice(user_ids)
+                record("load", lambda: load(user_id))
+
+    threads = [threading.Thread(target=writer) for _ in range(args.writers)]
+    threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent read/write stress test for the profile database")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--users", type=int, default=20, help="Distinct profiles to write")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--no-pragmas", action="store_true",
+                        help="Connect without SQLITE_PRAGMAS for comparison")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Must be set before utils.database is imported: it initializes DB_PATH on import
+        os.environ["FINAGENT_DB_PATH"] = os.path.join(tmp, "import.db")
+        from utils import database
+
+        # A fresh file per run: WAL mode persists in the file, so the
+        # comparison run must not reuse one that was opened with the pragmas
+        database._pool.close_all()
+        database._pool = database.ConnectionPool(
+            os.path.join(tmp, "stress.db"),
+            size=args.writers + args.readers,
+            pragmas={} if args.no_pragmas else None,
+        )
+        database.init_database()
+
+        results = defaultdict(list)
+        errors = defaultdict(int)
+        first_errors = {}
+        run(database, args, results, errors, first_errors)
+        database._pool.close_all()
+
+    mode = "no pragmas" if args.no_pragmas else "SQLITE_PRAGMAS"
+    print(f"{args.writers} writer(s), {args.readers} reader(s), {args.seconds:g}s, {mode}")
+    print(f"{'op':<8}{'count':>10}{'failed':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for op in sorted(results):
+        timings = sorted(results[op])
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        print(f"{op:<8}{len(timings):>10,}{errors[op]:>10,}"
+              f"{statistics.median(timings):>10.2f}{p99:>10.2f}{timings[-1]:>10.2f}")
+    for op, error in sorted(first_errors.items()):
+        print(f"first {op} error: {error}")
+    total_errors = sum(errors.values())
+    print("OK: no failed operations" if total_errors == 0 else f"FAILED: {total_errors} operation(s)")
+
+
+if __name__ == "__main__":
+    main()
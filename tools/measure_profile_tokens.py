@@ -0,0 +1,59 @@
+"""
+Measure Profile Tokens - Compare profile encodings across all stored users.
+
+Renders every profile in data/users.db with each encoding in
+PROFILE_RENDERERS and reports characters and estimated tokens per user,
+plus totals and the saving of each encoding relative to "verbose".
+
+Usage:
+    python -m tools.measure_profile_tokens
+    python -m tools.measure_profile_tokens --show compact
+"""
+
+import argparse
+
+from utils.context import estimate_tokens
+from utils.database import PROFILE_RENDERERS, get_user_profile, list_users
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare profile encodings by token count")
+    parser.add_argument("--show", choices=sorted(PROFILE_RENDERERS),
+                        help="Also print each profile rendered in this encoding")
+    args = parser.parse_args()
+
+    formats = list(PROFILE_RENDERERS)
+    totals = {fmt: 0 for fmt in formats}
+    users, cursor = list_users(limit=500)
+    while cursor is not None:
+        page, cursor = list_users(limit=500, after=cursor)
+        users += page
+
+    header = f"{'user':<32}" + "".join(f"{fmt + ' chars':>16}{fmt + ' tok':>14}" for fmt in formats)
+    print(header)
+    print("-" * len(header))
+    for user in users:
+        user_data = get_user_profile(user["user_id"])
+        if not user_data:
+            continue
+        row = f"{(user['name'] + ' (' + user['user_id'] + ')')[:31]:<32}"
+        for fmt in formats:
+            text = PROFILE_RENDERERS[fmt](user_data)
+            tokens = estimate_tokens(text)
+            totals[fmt] += tokens
+            row += f"{len(text):>16,}{tokens:>14,}"
+        print(row)
+        if args.show:
+            print(PROFILE_RENDERERS[args.show](user_data))
+            print()
+
+    print("-" * len(header))
+    print(f"{len(users)} profile(s), estimated tokens:")
+    baseline = totals.get("verbose", 0)
+    for fmt in formats:
+        saving = f" ({1 - totals[fmt] / baseline:.0%} smaller)" if baseline and fmt != "verbose" else ""
+        print(f"  {fmt:<10}{totals[fmt]:>10,}{saving}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+Mock AgentOS Backend - Local stand-in for benchmarking and offline development.
+
+Implements the endpoints the UI uses with realistic payload shapes:
+    GET  /agents, /teams                        (with ETag / 304 support)
+    POST /agents/{id}/runs, /teams/{id}/runs    (JSON or SSE streaming)
+    POST /agents/{id}/runs/{run_id}/cancel, /teams/{id}/runs/{run_id}/cancel
+    GET  /sessions/{session_id}                 (404 until a run used the session)
+
+Usage:
+    python -m tools.mock_backend --port 5111 --latency lognormal:1.0,0.5 \
+        --chunk-rate 40 --error-rate 0.05 --agents 9 --teams 2
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List
+from urllib.parse import parse_qs
+
+# Realistic agent roster (cycled when a larger catalog is requested)
+AGENT_TEMPLATES = [
+    ("tax-compliance-specialist", "Tax & Compliance Specialist", "Tax Advisor",
+     ["calculate_tax_liability", "compare_tax_regimes", "suggest_80c_investments"]),
+    ("market-intelligence-agent", "Market Intelligence Agent", "Market Analyst",
+     ["get_stock_price", "get_company_news", "get_analyst_recommendations"]),
+    ("spending-analysis-agent", "Spending Analysis Agent", "Budget Analyst",
+     ["categorize_expenses", "compute_savings_rate"]),
+    ("investment-planner", "Investment Planner", "Portfolio Strategist",
+     ["suggest_asset_allocation", "project_sip_corpus", "rebalance_portfolio"]),
+    ("insurance-advisor", "Insurance Advisor", "Risk Advisor",
+     ["compute_cover_gap", "compare_term_plans"]),
+    ("retirement-planner", "Retirement Planner", "Retirement Specialist",
+     ["project_retirement_corpus", "nps_projection"]),
+    ("real-estate-advisor", "Real Estate Advisor", "Property Analyst",
+     ["buy_vs_rent", "emi_affordability"]),
+    ("debt-manager", "Debt Manager", "Credit Counsellor",
+     ["prioritize_debts", "compute_foir"]),
+    ("goal-planner", "Goal Planner", "Financial Planner",
+     ["goal_sip_calculator", "inflation_adjust"]),
+]
+
+TEAM_TEMPLATES = [
+    ("financial-advisor-team", "Financial Advisor Team",
+     "Coordinates specialists to deliver holistic personal finance advice."),
+    ("investment-team", "Investment Team",
+     "Combines market intelligence and portfolio planning for investment decisions."),
+]
+
+MODEL = {"name": "claude-sonnet-4-20250514", "provider": "Anthropic", "id": "claude-sonnet-4"}
+
+LOREM = (
+    "Based on your profile, your current savings rate leaves room to build an "
+    "emergency fund covering six months of expenses before increasing equity "
+    "exposure. Consider maximizing Section 80C through ELSS and PPF, and use "
+    "80CCD(1B) for an additional NPS deduction. Review your term cover against "
+    "fifteen times annual income and keep EMIs within forty percent of take-home pay."
+).split()
+
+
+def parse_distribution(spec: str) -> Callable[[], float]:
+    """
+    Parse a latency distribution spec into a sampler (seconds, never negative).
+
+    Supported: "fixed:x", "uniform:a,b", "normal:mu,sd", "lognormal:median,sigma",
+    "exp:mean".
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        mu = math.log(values[0])
+        return lambda: random.lognormvariate(mu, values[1])
+    if kind == "exp":
+        return lambda: random.expovariate(1.0 / values[0])
+    raise ValueError(f"Unknown distribution: {spec}")
+
+
+def build_catalog(num_agents: int, num_teams: int):
+    """Build agents and teams lists shaped like the AgentOS responses."""
+    agents = []
+    for i in range(num_agents):
+        agent_id, name, role, tools = AGENT_TEMPLATES[i % len(AGENT_TEMPLATES)]
+        if i >= len(AGENT_TEMPLATES):
+            agent_id, name = f"{agent_id}-{i}", f"{name} {i}"
+        agents.append({
+            "id": agent_id,
+            "name": name,
+            "role": role,
+            "model": MODEL,
+            "tools": {"tools": [
+                {"name": tool, "description": f"{tool.replace('_', ' ').capitalize()}."}
+                for tool in tools
+            ]},
+            "system_message": {
+                "description": f"{name} for Indian personal finance. Gives specific, actionable guidance.",
+                "instructions": f"You are the {role}. Use the user profile. Cite numbers. Be concise.",
+            },
+        })
+
+    teams = []
+    for i in range(num_teams):
+        team_id, name, description = TEAM_TEMPLATES[i % len(TEAM_TEMPLATES)]
+        if i >= len(TEAM_TEMPLATES):
+            team_id, name = f"{team_id}-{i}", f"{name} {i}"
+        members = agents[i::max(num_teams, 1)][:5]
+        teams.append({
+            "id": team_id,
+            "name": name,
+            "description": description,
+            "model": MODEL,
+            "members": [
+                {
+                    "name": m["name"],
+                    "role": m["role"],
+                    "description": m["system_message"]["description"],
+                }
+                for m in members
+            ],
+            "system_message": {
+                "instructions": "Delegate to the right members and synthesize one answer.",
+            },
+        })
+    return agents, teams
+
+
+class MockBackend:
+    """Configuration and shared state for the mock server."""
+
+    def __init__(self, args):
+        self.latency = parse_distribution(args.latency)
+        self.chunk_rate = args.chunk_rate
+        self.response_words = args.response_words
+        self.words_per_chunk = args.words_per_chunk
+        self.error_rate = args.error_rate
+        self.hang_rate = args.hang_rate
+        self.agents, self.teams = build_catalog(args.agents, args.teams)
+        self.catalog_bodies = {
+            "/agents": json.dumps(self.agents).encode("utf-8"),
+            "/teams": json.dumps(self.teams).encode("utf-8"),
+        }
+        self.catalog_etags = {
+            path: '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+            for path, body in self.catalog_bodies.items()
+        }
+        self.cancelled = set()
+        self.sessions = {}  # session_id -> {"session_id", "user_id", "created_at", "runs"}
+        self.lock = threading.Lock()
+        self.stats = {"catalog": 0, "not_modified": 0, "runs": 0, "errors": 0, "session_checks": 0}
+
+    def count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+    def record_session(self, session_id: str, user_id: str):
+        if not session_id:
+            return
+        with self.lock:
+            session = self.sessions.setdefault(session_id, {
+                "session_id": session_id,
+                "user_id": user_id,
+                "created_at": int(time.time()),
+                "runs": 0,
+            })
+            session["runs"] += 1
+
+    def answer_words(self) -> List[str]:
+        return [LOREM[i % len(LOREM)] for i in range(self.response_words)]
+
+
+def make_handler(backend: MockBackend):
+    """Create a request handler class bound to the backend config."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, chunked streaming
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload: Any, headers: Dict[str, str] = None):
+            body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def _send_event(self, event: str, payload: Dict[str, Any]):
+            payload = {"event": event, "created_at": int(time.time()), **payload}
+            self._write_chunk(f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+        def do_GET(self):
+            path = self.path.split("?")[0].rstrip("/")
+            if path.startswith("/sessions/"):
+                backend.count("session_checks")
+                session = backend.sessions.get(path[len("/sessions/"):])
+                if session is None:
+                    self._send_json(404, {"detail": "Session not found"})
+                else:
+                    self._send_json(200, session)
+                return
+            if path not in backend.catalog_bodies:
+                self._send_json(404, {"detail": "Not Found"})
+                return
+            time.sleep(backend.latency() / 10)  # Catalog calls are much cheaper than runs
+            etag = backend.catalog_etags[path]
+            if self.headers.get("If-None-Match") == etag:
+                backend.count("not_modified")
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            backend.count("catalog")
+            self._send_json(200, backend.catalog_bodies[path], {"ETag": etag})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            form = parse_qs(self.rfile.read(length).decode("utf-8")) if length else {}
+            parts = [p for p in self.path.split("?")[0].split("/") if p]
+
+            # /{agents|teams}/{id}/runs/{run_id}/cancel
+            if len(parts) == 5 and parts[2] == "runs" and parts[4] == "cancel":
+                with backend.lock:
+                    backend.cancelled.add(parts[3])
+                self._send_json(200, {"message": "Run cancelled"})
+                return
+
+            if len(parts) != 3 or parts[0] not in ("agents", "teams") or parts[2] != "runs":
+                self._send_json(404, {"detail": "Not Found"})
+                return
+
+            collection = backend.agents if parts[0] == "agents" else backend.teams
+            if not any(item["id"] == parts[1] for item in collection):
+                self._send_json(404, {"detail": f"{parts[0][:-1].capitalize()} not found"})
+                return
+
+            backend.count("runs")
+            roll = random.random()
+            if roll < backend.error_rate:
+                backend.count("errors")
+                time.sleep(backend.latency() / 4)
+                self._send_json(500, {"detail": "Injected backend error"})
+                return
+            if roll < backend.error_rate + backend.hang_rate:
+                time.sleep(3600)  # Simulated hung run
+                return
+
+            message = form.get("message", [""])[0]
+            backend.record_session(
+                form.get("session_id", [None])[0], form.get("user_id", [None])[0]
+            )
+            stream = form.get("stream", ["false"])[0].lower() == "true"
+            prefix = "Team" if parts[0] == "teams" else ""
+            run_id = str(uuid.uuid4())
+            words = backend.answer_words()
+            input_tokens = max(1, len(message) // 4)
+            output_tokens = max(1, len(" ".join(words)) // 4)
+            metrics = {
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            }
+
+            if not stream:
+                time.sleep(backend.latency() + len(words) / backend.words_per_chunk / backend.chunk_rate)
+                self._send_json(200, {
+                    "run_id": run_id,
+                    "session_id": form.get("session_id", [None])[0],
+                    "content": " ".join(words),
+                    "content_type": "str",
+                    "metrics": metrics,
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                self._send_event(f"{prefix}RunStarted", {"run_id": run_id})
+                time.sleep(backend.latency())  # Time to first token
+                step = backend.words_per_chunk
+                for i in range(0, len(words), step):
+                    if run_id in backend.cancelled:
+                        self._send_event(f"{prefix}RunCancelled", {"run_id": run_id})
+                        break
+                    chunk = " ".join(words[i : i + step]) + " "
+                    self._send_event(f"{prefix}RunContent", {"run_id": run_id, "content": chunk})
+                    time.sleep(1.0 / backend.chunk_rate)
+                else:
+                    self._send_event(f"{prefix}RunCompleted", {
+                        "run_id": run_id,
+                        "content": " ".join(words),
+                        "metrics": metrics,
+                    })
+                self._write_chunk(b"")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Client went away (e.g. cancelled in the UI)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock AgentOS backend")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5111)
+    parser.add_argument("--latency", default="lognormal:1.0,0.5",
+                        help="Run latency / time-to-first-token distribution in seconds")
+    parser.add_argument("--chunk-rate", type=float, default=30.0,
+                        help="Streamed chunks per second after the first token")
+    parser.add_argument("--words-per-chunk", type=int, default=3)
+    parser.add_argument("--response-words", type=int, default=150)
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of runs answered with HTTP 500")
+    parser.add_argument("--hang-rate", type=float, default=0.0,
+                        help="Fraction of runs that never respond")
+    parser.add_argument("--agents", type=int, default=len(AGENT_TEMPLATES))
+    parser.add_argument("--teams", type=int, default=len(TEAM_TEMPLATES))
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    backend = MockBackend(args)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(backend))
+    server.daemon_threads = True
+    print(f"Mock AgentOS backend on http://{args.host}:{args.port} "
+          f"({len(backend.agents)} agents, {len(backend.teams)} teams)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Stats: {backend.stats}")
+
+
+if __name__ == "__main__":
+    main()
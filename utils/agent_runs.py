@@ -0,0 +1,434 @@
+"""
+Agent/team run execution for the AgentOS backend.
+Runs are executed on a bounded background pool and tracked by RunHandle objects,
+so Streamlit script threads never block for the length of an LLM run.
+"""
+
+import hashlib
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import requests
+
+from config.config import (
+    API_BASE_URL,
+    AGENT_CANCEL_ENDPOINT,
+    TEAM_CANCEL_ENDPOINT,
+    CATALOG_TIMEOUT,
+    RUN_TIMEOUT,
+    RUN_TOTAL_TIMEOUT,
+    RUN_EXECUTOR_WORKERS,
+    RUN_QUEUE_LIMIT,
+)
+from utils.api_client import (
+    api_post,
+    iter_sse_events,
+    get_circuit_state,
+    CircuitOpenError,
+)
+
+# Shared pool for agent/team runs across all sessions
+_executor = ThreadPoolExecutor(
+    max_workers=RUN_EXECUTOR_WORKERS, thread_name_prefix="agent-run"
+)
+
+# Backend cancel requests get their own threads, so they are not queued
+# behind the runs they are meant to stop
+_cancel_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="run-cancel")
+
+# Runs submitted but not yet finished or cancelled (bounded by RUN_QUEUE_LIMIT)
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+# Single-flight registry: dedupe key -> unfinished handle
+_single_flight: Dict[str, "RunHandle"] = {}
+_single_flight_lock = threading.Lock()
+
+
+@dataclass
+class RunHandle:
+    """
+    Tracks one background agent/team run.
+
+    The worker thread updates `content` as chunks stream in and sets
+    `result` ({"success", "content", "total_tokens"}) when finished.
+    """
+
+    target_id: str
+    item_type: str
+    handle_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    submitted_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+    status: str = "pending"  # pending, running, done, cancelled
+    content: str = ""
+    run_id: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    dedupe_key: Optional[str] = None
+    _done: threading.Event = field(default_factory=threading.Event, repr=False)
+    _cancelled: threading.Event = field(default_factory=threading.Event, repr=False)
+    # Live backend response, closed on cancel to unblock the worker
+    _response: Optional[requests.Response] = field(default=None, repr=False)
+    _holds_slot: bool = field(default=False, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since submission, frozen once the run has finished."""
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.submitted_at
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Block until the run finishes (or the timeout expires) and return its result."""
+        self._done.wait(timeout)
+        return self.result
+
+    def _finish(self, result: Dict[str, Any], status: str = "done"):
+        if self._done.is_set():
+            return
+        self.result = result
+        self.status = status
+        self.finished_at = time.monotonic()
+        self._done.set()
+
+
+def error_response(error: Exception) -> Dict[str, Any]:
+    """Map a request exception to the error dict shown in the chat."""
+    if isinstance(error, CircuitOpenError):
+        retry_in = get_circuit_state(API_BASE_URL)["retry_in"]
+        content = f"🔌 The backend is currently unavailable. Please try again in {retry_in:.0f}s."
+    elif isinstance(error, requests.exceptions.Timeout):
+        content = "⏱️ Request timed out. The agent is taking too long to respond. Please try again."
+    elif isinstance(error, requests.exceptions.ConnectionError):
+        content = "🔌 Unable to connect to the backend. Please ensure the API is running at http://localhost:5111"
+    else:
+        content = f"❌ Error communicating with the agent: {str(error)}"
+    return {
+        "success": False,
+        "content": content,
+        "total_tokens": 0,
+    }
+
+
+def _abort_response(response: requests.Response):
+    """Close a response from another thread, waking a worker blocked reading it."""
+    try:
+        # Closing alone does not interrupt a blocked socket read
+        response.raw.shutdown()
+    except Exception:
+        pass
+    response.close()
+
+
+def _attach_response(handle: RunHandle, response: requests.Response):
+    """Keep the live response on the handle so cancel_run can close it."""
+    handle._response = response
+    if handle.cancelled:
+        # Cancelled while the request was being sent
+        _abort_response(response)
+        raise requests.exceptions.ConnectionError("Run cancelled")
+
+
+@contextmanager
+def _enforce_deadline(response: requests.Response, deadline: float) -> Iterator[None]:
+    """
+    Abort the response once the run's total budget expires.
+
+    Read timeouts only bound the gap between received bytes, so a backend
+    trickling data (or keep-alives) could otherwise hold a run open
+    indefinitely. A read broken by the deadline is re-raised as a Timeout.
+    """
+    timer = threading.Timer(max(0.0, deadline - time.monotonic()), _abort_response, (response,))
+    timer.daemon = True
+    timer.start()
+    try:
+        yield
+    except Exception as e:
+        if time.monotonic() >= deadline and not isinstance(e, requests.exceptions.Timeout):
+            raise requests.exceptions.Timeout("Run exceeded total time budget") from e
+        raise
+    finally:
+        timer.cancel()
+
+
+def _run_blocking(handle: RunHandle, endpoint: str, form_data: Dict[str, str]) -> Dict[str, Any]:
+    """Execute a non-streaming run (the whole run must finish within the total budget)."""
+    deadline = time.monotonic() + RUN_TOTAL_TIMEOUT
+    # Streamed at the transport level so the response can be closed on cancel
+    # or at the deadline while its body is read
+    response = api_post(
+        endpoint,
+        data=form_data,
+        headers={"accept": "application/json"},
+        stream=True,
+        timeout=(RUN_TIMEOUT[0], RUN_TOTAL_TIMEOUT),
+    )
+    try:
+        _attach_response(handle, response)
+        response.raise_for_status()
+        with _enforce_deadline(response, deadline):
+            result = response.json()
+    finally:
+        response.close()
+
+    # Extract content and token info
+    content = result.get("content", "No response received.")
+    metrics = result.get("metrics", {})
+    total_tokens = metrics.get("total_tokens", 0)
+
+    return {
+        "success": True,
+        "content": content,
+        "total_tokens": total_tokens,
+    }
+
+
+def _run_streaming(handle: RunHandle, endpoint: str, form_data: Dict[str, str]) -> Dict[str, Any]:
+    """Execute a streaming run, accumulating content on the handle as it arrives."""
+    # Team runs also stream their members' events; only the team's own
+    # events make up the answer shown to the user.
+    prefix = "Team" if handle.item_type == "team" else ""
+    started_event = f"{prefix}RunStarted"
+    content_event = f"{prefix}RunContent"
+    completed_event = f"{prefix}RunCompleted"
+    error_event = f"{prefix}RunError"
+
+    # Read timeout bounds the gap between chunks; the deadline bounds the run
+    deadline = time.monotonic() + RUN_TOTAL_TIMEOUT
+    response = api_post(
+        endpoint,
+        data=form_data,
+        headers={"accept": "text/event-stream"},
+        stream=True,
+        timeout=RUN_TIMEOUT,
+    )
+
+    chunks = []
+    total_tokens = 0
+    try:
+        _attach_response(handle, response)
+        response.raise_for_status()
+        with _enforce_deadline(response, deadline):
+            for event in iter_sse_events(response, deadline):
+                if handle.cancelled:
+                    break
+                event_type = event.get("event")
+                if event_type == started_event:
+                    handle.run_id = event.get("run_id")
+                elif event_type == content_event:
+                    chunk = event.get("content")
+                    if chunk:
+                        chunks.append(chunk if isinstance(chunk, str) else str(chunk))
+                        handle.content = "".join(chunks)
+                elif event_type == completed_event:
+                    # Completed event carries the final content and run metrics
+                    if not chunks and event.get("content"):
+                        chunks.append(str(event.get("content")))
+                    total_tokens = (event.get("metrics") or {}).get("total_tokens", 0)
+                elif event_type == error_event:
+                    return {
+                        "success": False,
+                        "content": f"❌ Error communicating with the agent: {event.get('content', 'run failed')}",
+                        "total_tokens": 0,
+                    }
+    finally:
+        response.close()
+
+    return {
+        "success": True,
+        "content": "".join(chunks) or "No response received.",
+        "total_tokens": total_tokens,
+    }
+
+
+def execute_run(
+    handle: RunHandle, endpoint: str, form_data: Dict[str, str], stream: bool
+) -> Dict[str, Any]:
+    """
+    Execute a run on the current thread and record the result on the handle.
+
+    Never raises: request failures are turned into error dicts.
+    """
+    handle.status = "running"
+    try:
+        if stream:
+            result = _run_streaming(handle, endpoint, form_data)
+        else:
+            result = _run_blocking(handle, endpoint, form_data)
+    except Exception as e:
+        # Any failure must still finish the handle, or the UI would poll forever
+        result = error_response(e)
+    handle._finish(result)
+    return result
+
+
+def run_key(session_id: str, target_id: str, message: str) -> str:
+    """Build the single-flight key for a message sent to a target in a session."""
+    digest = hashlib.sha256(message.strip().encode("utf-8")).hexdigest()
+    return f"{session_id}:{target_id}:{digest}"
+
+
+def _forget(handle: RunHandle):
+    """Drop a finished or cancelled handle from the single-flight registry."""
+    if handle.dedupe_key is None:
+        return
+    with _single_flight_lock:
+        if _single_flight.get(handle.dedupe_key) is handle:
+            del _single_flight[handle.dedupe_key]
+
+
+def _release_slot(handle: RunHandle):
+    """Give back the handle's RUN_QUEUE_LIMIT slot (once, on finish or cancel)."""
+    global _in_flight
+    with _in_flight_lock:
+        if handle._holds_slot:
+            handle._holds_slot = False
+            _in_flight -= 1
+
+
+def _execute_and_release(handle, endpoint, form_data, stream, on_success):
+    try:
+        result = execute_run(handle, endpoint, form_data, stream)
+        if on_success is not None and result.get("success") and not handle.cancelled:
+            on_success(result)
+    finally:
+        handle._response = None
+        _forget(handle)
+        _release_slot(handle)
+
+
+def submit_run(
+    target_id: str,
+    item_type: str,
+    endpoint: str,
+    form_data: Dict[str, str],
+    stream: bool,
+    dedupe_key: Optional[str] = None,
+    on_success: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> RunHandle:
+    """
+    Submit a run to the background pool and return its handle immediately.
+
+    When a dedupe key is given and a run with the same key is still in
+    flight, that run's handle is returned instead of starting a new one,
+    so double submits and reruns do not pay for a second LLM run.
+
+    The form data must be fully built by the caller: worker threads have
+    no access to Streamlit session state. If the backend circuit is open
+    or the pool is saturated, the handle is returned already finished
+    with an error result.
+
+    Args:
+        target_id: The ID of the agent or team
+        item_type: Either "agent" or "team"
+        endpoint: Run endpoint URL
+        form_data: Form fields for the run request
+        stream: Whether to request a streamed run
+        dedupe_key: Optional single-flight key (see run_key)
+        on_success: Optional callback run on the worker with a successful result
+
+    Returns:
+        RunHandle tracking the run
+    """
+    global _in_flight
+    if dedupe_key is not None:
+        with _single_flight_lock:
+            existing = _single_flight.get(dedupe_key)
+            if existing is not None and not existing.done:
+                return existing
+
+    handle = RunHandle(target_id=target_id, item_type=item_type)
+
+    # Fail fast while the backend circuit is open
+    if get_circuit_state(API_BASE_URL)["state"] == "open":
+        handle._finish(error_response(CircuitOpenError()))
+        return handle
+
+    with _in_flight_lock:
+        if _in_flight >= RUN_QUEUE_LIMIT:
+            handle._finish(
+                {
+                    "success": False,
+                    "content": "🚦 The server is busy handling other requests. Please try again shortly.",
+                    "total_tokens": 0,
+                }
+            )
+            return handle
+        _in_flight += 1
+        handle._holds_slot = True
+
+    if dedupe_key is not None:
+        with _single_flight_lock:
+            existing = _single_flight.get(dedupe_key)
+            if existing is not None and not existing.done:
+                # Lost a race with an identical submission - attach to it
+                _release_slot(handle)
+                return existing
+            handle.dedupe_key = dedupe_key
+            _single_flight[dedupe_key] = handle
+
+    _executor.submit(
+        _execute_and_release, handle, endpoint, form_data, stream, on_success
+    )
+    return handle
+
+
+def completed_run(target_id: str, item_type: str, result: Dict[str, Any]) -> RunHandle:
+    """Wrap an already available result (e.g. a cache hit) in a finished handle."""
+    handle = RunHandle(target_id=target_id, item_type=item_type)
+    handle._finish(result)
+    return handle
+
+
+def cancel_run(handle: RunHandle):
+    """
+    Cancel a run: release the UI immediately and ask the backend to stop it.
+
+    The run's queue slot is freed and its live response closed, so the
+    worker stops reading right away. A non-streaming run still waiting for
+    response headers cannot be interrupted; its worker finishes when the
+    backend answers or the total budget expires. If the backend run id is
+    known, the AgentOS cancel endpoint is called best-effort.
+    """
+    if handle.done:
+        return
+    handle._cancelled.set()
+    _forget(handle)
+    partial = handle.content
+    handle._finish(
+        {
+            "success": False,
+            "content": f"{partial}\n\n_⏹️ Cancelled_" if partial else "⏹️ Run cancelled.",
+            "total_tokens": 0,
+        },
+        status="cancelled",
+    )
+    _release_slot(handle)
+    response = handle._response
+    if response is not None:
+        _abort_response(response)
+
+    if handle.run_id:
+        if handle.item_type == "team":
+            url = TEAM_CANCEL_ENDPOINT.format(team_id=handle.target_id, run_id=handle.run_id)
+        else:
+            url = AGENT_CANCEL_ENDPOINT.format(agent_id=handle.target_id, run_id=handle.run_id)
+        _cancel_executor.submit(_post_cancel, url)
+
+
+def _post_cancel(url: str):
+    try:
+        api_post(url, timeout=CATALOG_TIMEOUT)
+    except requests.exceptions.RequestException:
+        pass
@@ -0,0 +1,285 @@
+"""
+HTTP client utility for talking to the AgentOS backend.
+Provides a single process-wide pooled session shared by all Streamlit sessions,
+with retries for idempotent GETs and a per-host circuit breaker.
+"""
+
+import json
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.config import (
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    GET_MAX_RETRIES,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+)
+
+# Status codes that mean the backend (or its proxy) is unhealthy
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+# Shared session (created lazily, guarded by a lock)
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _build_session() -> requests.Session:
+    """Create a requests session with a keep-alive connection pool per backend host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        pool_block=False,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Get the shared HTTP session, creating it on first use.
+
+    The underlying urllib3 pools are thread-safe, so the same session
+    is reused by every Streamlit script thread in the process.
+
+    Returns:
+        The process-wide requests.Session
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while a host's circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Minimal circuit breaker for one backend host.
+
+    closed: requests flow normally; consecutive failures are counted.
+    open: requests fail fast until the reset timeout elapses.
+    half_open: a single trial request is let through; its outcome closes
+    or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Current state: "closed", "open" or "half_open"."""
+        with self._lock:
+            return self._state_locked()
+
+    def _state_locked(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a trial request through."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow_request(self) -> bool:
+        """Whether a request may be sent now (claims the half-open trial slot)."""
+        with self._lock:
+            state = self._state_locked()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    """Get the circuit breaker for the host serving the given URL."""
+    host = urlsplit(url).netloc
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+            _breakers[host] = breaker
+        return breaker
+
+
+def get_circuit_state(url: str) -> Dict[str, Any]:
+    """
+    Get the breaker state for the host serving the given URL.
+
+    Returns:
+        Dictionary with "state" ("closed", "open" or "half_open") and
+        "retry_in" (seconds until the next trial request is allowed)
+    """
+    breaker = get_breaker(url)
+    return {"state": breaker.state, "retry_in": breaker.retry_in()}
+
+
+def _send(method: str, url: str, **kwargs) -> requests.Response:
+    """Send one request through the breaker, recording its outcome."""
+    breaker = get_breaker(url)
+    if not breaker.allow_request():
+        raise CircuitOpenError(
+            f"Backend circuit open; retrying in {breaker.retry_in():.0f}s"
+        )
+    try:
+        response = get_session().request(method, url, **kwargs)
+    except Exception:
+        # Any failure (incl. ChunkedEncodingError, TooManyRedirects) must be
+        # recorded, or a half-open trial slot would never be released
+        breaker.record_failure()
+        raise
+    if response.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff delay for the given retry attempt."""
+    return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * (2 ** attempt)))
+
+
+def api_get(url: str, max_retries: int = GET_MAX_RETRIES, **kwargs) -> requests.Response:
+    """
+    Issue a GET request through the shared session.
+
+    GETs are idempotent, so connection errors, timeouts and 502/503/504
+    responses are retried with jittered exponential backoff. An open
+    circuit is never retried.
+    """
+    attempt = 0
+    while True:
+        try:
+            response = _send("GET", url, **kwargs)
+        except CircuitOpenError:
+            raise
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt >= max_retries:
+                raise
+        else:
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= max_retries:
+                return response
+            response.close()
+        time.sleep(_backoff_delay(attempt))
+        attempt += 1
+
+
+def api_post(url: str, **kwargs) -> requests.Response:
+    """Issue a POST request through the shared session (never retried)."""
+    return _send("POST", url, **kwargs)
+
+
+def close_session():
+    """Close the shared session and drop all pooled connections."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def iter_sse_events(
+    response: requests.Response, deadline: Optional[float] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Parse a text/event-stream response into run events.
+
+    AgentOS streams each run event as an ``event:`` line followed by a
+    ``data:`` line holding the JSON payload, separated by blank lines.
+
+    Args:
+        response: A streaming response (requested with stream=True)
+        deadline: Optional time.monotonic() deadline, checked on every
+            received line (keep-alives included)
+
+    Yields:
+        Event payload dictionaries, with the "event" key filled in from the
+        SSE event name when the payload does not carry one
+    """
+    # SSE is always UTF-8; requests would otherwise assume ISO-8859-1 for text/*
+    response.encoding = "utf-8"
+    event_name = None
+    data_lines = []
+
+    # chunk_size=None yields data as soon as it arrives instead of buffering
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if deadline is not None and time.monotonic() > deadline:
+            raise requests.exceptions.Timeout("Run exceeded total time budget")
+        if line is None:
+            continue
+        if line == "":
+            # Blank line terminates the current event
+            if data_lines:
+                payload = _parse_event_data("\n".join(data_lines), event_name)
+                if payload is not None:
+                    yield payload
+            event_name = None
+            data_lines = []
+        elif line.startswith(":"):
+            continue  # SSE comment / keep-alive
+        elif line.startswith("event:"):
+            event_name = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
+    if data_lines:
+        payload = _parse_event_data("\n".join(data_lines), event_name)
+        if payload is not None:
+            yield payload
+
+
+def _parse_event_data(data: str, event_name: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Decode a single SSE data block, tolerating non-JSON keep-alives."""
+    try:
+        payload = json.loads(data)
+    except ValueError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    if event_name and not payload.get("event"):
+        payload["event"] = event_name
+    return payload
@@ -0,0 +1,193 @@
+"""
+Catalog utility for loading the agents and teams lists from the AgentOS backend.
+Both catalog requests are issued concurrently on a shared thread pool, and the
+results are kept in a process-wide cache shared by all Streamlit sessions.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from config.config import (
+    AGENTS_ENDPOINT,
+    TEAMS_ENDPOINT,
+    CATALOG_FETCH_WORKERS,
+    CATALOG_CACHE_TTL,
+    CATALOG_STALE_TTL,
+    CATALOG_TIMEOUT,
+)
+from utils.api_client import api_get
+
+# Shared pool for catalog requests (threads only do HTTP, never touch session state)
+_executor = ThreadPoolExecutor(
+    max_workers=CATALOG_FETCH_WORKERS, thread_name_prefix="catalog"
+)
+
+
+@dataclass
+class _CacheEntry:
+    """Cached catalog payload plus the validators needed to revalidate it."""
+
+    data: List[Dict[str, Any]]
+    fetched_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    refreshing: bool = False
+
+
+@dataclass
+class _EndpointState:
+    """Per-endpoint cache slot; the lock lets one thread refresh at a time."""
+
+    entry: Optional[_CacheEntry] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+_cache: Dict[str, _EndpointState] = {
+    AGENTS_ENDPOINT: _EndpointState(),
+    TEAMS_ENDPOINT: _EndpointState(),
+}
+
+# Guards the "refreshing" flag so only one background refresh is scheduled
+_refresh_flag_lock = threading.Lock()
+
+
+def _refresh(endpoint: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Revalidate a catalog endpoint, using a conditional GET when possible.
+
+    Returns:
+        The current catalog list, or None if the request failed
+    """
+    state = _cache[endpoint]
+    entry = state.entry
+    headers = {}
+    if entry is not None:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+    try:
+        response = api_get(endpoint, headers=headers, timeout=CATALOG_TIMEOUT)
+        if response.status_code == 304 and entry is not None:
+            # Unchanged - keep the payload, restart the TTL
+            entry.fetched_at = time.monotonic()
+            return entry.data
+        response.raise_for_status()
+        data = response.json()
+    except (requests.exceptions.RequestException, ValueError):
+        return None
+
+    state.entry = _CacheEntry(
+        data=data,
+        fetched_at=time.monotonic(),
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+    )
+    return data
+
+
+def _background_refresh(endpoint: str):
+    """Refresh a stale entry off the request path."""
+    state = _cache[endpoint]
+    with state.lock:
+        try:
+            _refresh(endpoint)
+        finally:
+            if state.entry is not None:
+                state.entry.refreshing = False
+
+
+def _fresh_data(endpoint: str) -> Optional[List[Dict[str, Any]]]:
+    """Return the cached list if it is within the TTL, else None."""
+    entry = _cache[endpoint].entry
+    if entry is not None and time.monotonic() - entry.fetched_at < CATALOG_CACHE_TTL:
+        return entry.data
+    return None
+
+
+def _fetch_list(endpoint: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Get a catalog list through the shared cache.
+
+    Fresh entries are returned directly. Stale entries (older than the TTL
+    but within the stale window) are returned immediately while a single
+    background refresh runs. Missing or expired entries are fetched
+    synchronously, with concurrent callers waiting on the same fetch.
+
+    Returns:
+        The catalog list, or None if it could not be loaded
+    """
+    state = _cache[endpoint]
+    entry = state.entry
+
+    if entry is not None:
+        age = time.monotonic() - entry.fetched_at
+        if age < CATALOG_CACHE_TTL:
+            return entry.data
+        if age < CATALOG_CACHE_TTL + CATALOG_STALE_TTL:
+            with _refresh_flag_lock:
+                start_refresh = not entry.refreshing
+                entry.refreshing = True
+            if start_refresh:
+                _executor.submit(_background_refresh, endpoint)
+            return entry.data
+
+    with state.lock:
+        # Another session may have refreshed it while we waited
+        entry = state.entry
+        if entry is not None and time.monotonic() - entry.fetched_at < CATALOG_CACHE_TTL:
+            return entry.data
+        return _refresh(endpoint)
+
+
+def invalidate_catalog_cache():
+    """Drop all cached catalog data so the next load hits the backend."""
+    for state in _cache.values():
+        with state.lock:
+            state.entry = None
+
+
+def fetch_agents() -> Optional[List[Dict[str, Any]]]:
+    """Fetch agents from the API (None on failure)."""
+    return _fetch_list(AGENTS_ENDPOINT)
+
+
+def fetch_teams() -> Optional[List[Dict[str, Any]]]:
+    """Fetch teams from the API (None on failure)."""
+    return _fetch_list(TEAMS_ENDPOINT)
+
+
+def fetch_catalog(
+    include_teams: bool = True, include_agents: bool = True
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[List[Dict[str, Any]]]]:
+    """
+    Fetch teams and agents concurrently.
+
+    Args:
+        include_teams: Whether to fetch the teams list
+        include_agents: Whether to fetch the agents list
+
+    Returns:
+        (teams, agents) tuple; an entry is None if it was not requested
+        or its request failed
+    """
+    # Fast path: everything requested is still fresh in the shared cache
+    teams = _fresh_data(TEAMS_ENDPOINT) if include_teams else None
+    agents = _fresh_data(AGENTS_ENDPOINT) if include_agents else None
+    if (teams is not None or not include_teams) and (
+        agents is not None or not include_agents
+    ):
+        return teams, agents
+
+    teams_future = _executor.submit(fetch_teams) if include_teams else None
+    agents_future = _executor.submit(fetch_agents) if include_agents else None
+
+    teams = teams_future.result() if teams_future else None
+    agents = agents_future.result() if agents_future else None
+    return teams, agents
@@ -0,0 +1,389 @@
+"""
+Context assembly for agent prompts.
+Packs the user profile, current query and conversation history into a token budget.
+"""
+
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from config.config import (
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_TOKEN_BUDGETS,
+    SUMMARY_TOKEN_BUDGET,
+    PROFILE_FORMAT,
+    PROFILE_FORMATS,
+    CONTEXT_LAYOUT,
+    CONTEXT_LAYOUTS,
+    HISTORY_MODE,
+    HISTORY_MODES,
+    PROFILE_SECTIONS,
+    PROFILE_ALWAYS_SECTIONS,
+    PROFILE_SECTION_RULES,
+)
+
+# Rough local estimate; no tokenizer dependency
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of a string without a tokenizer.
+
+    Uses ~4 characters per token for ASCII text and counts each non-ASCII
+    character (₹, emoji, Devanagari) as its own token, which is closer to
+    how BPE tokenizers treat them.
+    """
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return math.ceil((len(text) - non_ascii) / CHARS_PER_TOKEN) + non_ascii
+
+
+def get_token_budget(target_id: Optional[str]) -> int:
+    """Get the prompt token budget for an agent/team (falls back to the default)."""
+    return CONTEXT_TOKEN_BUDGETS.get(target_id, CONTEXT_TOKEN_BUDGET)
+
+
+def get_profile_format(target_id: Optional[str]) -> str:
+    """Get the profile encoding for an agent/team (falls back to the default)."""
+    return PROFILE_FORMATS.get(target_id, PROFILE_FORMAT)
+
+
+def get_context_layout(target_id: Optional[str]) -> str:
+    """Get the prompt layout for an agent/team (falls back to the default)."""
+    return CONTEXT_LAYOUTS.get(target_id, CONTEXT_LAYOUT)
+
+
+def get_profile_sections(
+    target_id: Optional[str], item: Optional[Dict[str, Any]], item_type: Optional[str]
+) -> Optional[List[str]]:
+    """
+    Get the profile sections an agent/team should receive.
+
+    Explicit PROFILE_SECTIONS entries win. Otherwise agents get the
+    sections their catalog tools need (see PROFILE_SECTION_RULES) plus
+    PROFILE_ALWAYS_SECTIONS. Teams, unknown targets and agents whose tools
+    match no rule get the full profile.
+
+    Args:
+        target_id: The ID of the agent or team
+        item: The agent/team catalog entry (None if unknown)
+        item_type: Either "agent" or "team"
+
+    Returns:
+        List of section keys, or None for the full profile
+    """
+    explicit = PROFILE_SECTIONS.get(target_id)
+    if explicit is not None:
+        return None if explicit == "all" else list(explicit)
+    if item is None or item_type != "agent":
+        return None
+
+    tool_names = [
+        tool.get("name", "") for tool in (item.get("tools") or {}).get("tools", [])
+    ]
+    matched = []
+    for pattern, sections in PROFILE_SECTION_RULES.items():
+        if any(re.search(pattern, name, re.IGNORECASE) for name in tool_names):
+            matched.extend(sections)
+    if not matched:
+        return None
+    return sorted(set(PROFILE_ALWAYS_SECTIONS) | set(matched))
+
+
+def get_history_mode(target_id: Optional[str]) -> str:
+    """Get the history selection mode for an agent/team (falls back to the default)."""
+    return HISTORY_MODES.get(target_id, HISTORY_MODE)
+
+
+def prefix_reuse_ratio(previous: str, current: str) -> float:
+    """Fraction of the current prompt that repeats the previous prompt's leading bytes."""
+    if not previous or not current:
+        return 0.0
+    return len(os.path.commonprefix([previous, current])) / len(current)
+
+
+def format_history_line(msg: Dict[str, Any]) -> str:
+    """Format one history message as it appears in the prompt."""
+    role = msg.get("role", "user")
+    # Use "you" instead of "assistant" for agent messages
+    display_role = "you" if role == "assistant" else role
+    return f"\n{display_role}: {msg.get('content', '')}"
+
+
+@dataclass
+class ContextResult:
+    """Assembled prompt plus a report of what was kept and dropped."""
+
+    message: str
+    budget: int
+    tokens: int = 0
+    history_included: int = 0
+    history_dropped: int = 0
+    profile_truncated: bool = False
+    summary_included: bool = False
+    dropped: List[str] = field(default_factory=list)
+    # Packed sections, combined into `message` by layout_context
+    profile_part: str = field(default="", repr=False)
+    query_part: str = field(default="", repr=False)
+    history_part: str = field(default="", repr=False)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "budget": self.budget,
+            "tokens": self.tokens,
+            "history_included": self.history_included,
+            "history_dropped": self.history_dropped,
+            "profile_truncated": self.profile_truncated,
+            "summary_included": self.summary_included,
+            "dropped": self.dropped,
+        }
+
+
+def _truncate_lines(text: str, max_tokens: int) -> str:
+    """Keep whole leading lines of text while they fit in max_tokens."""
+    kept = []
+    used = 0
+    for line in text.splitlines(keepends=True):
+        cost = estimate_tokens(line)
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    return "".join(kept)
+
+
+# A pinned message is truncated rather than dropped if at least this much fits
+MIN_TRUNCATED_TOKENS = 32
+TRUNCATION_MARK = " …[truncated]"
+
+
+def _truncate_text(text: str, max_tokens: int) -> str:
+    """Cut text to max_tokens (including the truncation mark), by whole lines if possible."""
+    budget = max_tokens - estimate_tokens(TRUNCATION_MARK)
+    kept = _truncate_lines(text, budget)
+    if not kept.strip():
+        kept = text[: max(0, budget) * CHARS_PER_TOKEN]
+        while kept and estimate_tokens(kept) > budget:
+            kept = kept[: int(len(kept) * 0.9)]
+    return kept.rstrip() + TRUNCATION_MARK
+
+
+def pack_context(
+    current_message: str,
+    profile_text: str,
+    history: List[Dict[str, Any]],
+    budget: int,
+    summary_text: str = "",
+    priority: Optional[List[int]] = None,
+) -> ContextResult:
+    """
+    Decide what fits in the token budget, without laying out the message.
+
+    Priority: the current query is always kept, then the profile (truncated
+    by whole lines if it alone would overflow), then the rolling summary of
+    older turns, then history newest-first until the budget is used up.
+    Kept history is emitted oldest-first.
+
+    With `priority` (retrieval mode), those history positions are packed
+    first, in the given order, and truncated rather than dropped when they
+    do not fit whole; the remaining history then fills newest-first,
+    skipping messages that do not fit instead of stopping at the first one.
+    Without it, history is a contiguous newest suffix, so the dropped
+    messages are exactly the oldest `history_dropped` (as the rolling
+    summary expects).
+
+    Args:
+        current_message: The current user query
+        profile_text: Formatted profile text ("" when no profile is active)
+        history: Prior messages, oldest first (current message excluded)
+        budget: Token budget for the whole message
+        summary_text: Rolling summary of turns older than the history window
+        priority: History positions to pack first (e.g. retrieved turns by score)
+
+    Returns:
+        ContextResult with the packed sections and what was dropped
+    """
+    result = ContextResult(message="", budget=budget)
+
+    query_part = f"CURRENT USER QUERY: {current_message}"
+    remaining = budget - estimate_tokens(query_part)
+
+    profile_part = ""
+    if profile_text:
+        profile_part = f"USER PROFILE:\n{profile_text}\n\n"
+        cost = estimate_tokens(profile_part)
+        if cost > remaining:
+            truncated = _truncate_lines(profile_text, max(0, remaining - 4))
+            result.profile_truncated = True
+            result.dropped.append(f"profile ({cost - estimate_tokens(truncated)} tokens)")
+            profile_part = f"USER PROFILE:\n{truncated}\n\n" if truncated.strip() else ""
+        remaining -= estimate_tokens(profile_part)
+
+    # Rolling summary sits at the top of the history section
+    header = "\nHISTORY CONVERSATION:"
+    if summary_text:
+        summary_part = f"{header}\n(summary of earlier conversation)\n{summary_text}"
+        if estimate_tokens(summary_part) <= remaining:
+            header = summary_part
+            result.summary_included = True
+        else:
+            result.dropped.append("conversation summary")
+
+    kept_lines: Dict[int, str] = {}
+    remaining -= estimate_tokens(header)
+
+    # Pinned messages first, truncated if need be
+    for index in priority or []:
+        if index in kept_lines:
+            continue
+        line = format_history_line(history[index])
+        cost = estimate_tokens(line)
+        if cost > remaining:
+            if remaining < MIN_TRUNCATED_TOKENS:
+                continue
+            line = _truncate_text(line, remaining)
+            cost = estimate_tokens(line)
+        kept_lines[index] = line
+        remaining -= cost
+
+    # Then history newest-first
+    for index in range(len(history) - 1, -1, -1):
+        if index in kept_lines:
+            continue
+        line = format_history_line(history[index])
+        cost = estimate_tokens(line)
+        if cost > remaining:
+            if priority is not None:
+                continue
+            result.history_dropped = index + 1
+            result.dropped.append(f"{index + 1} older message(s)")
+            break
+        kept_lines[index] = line
+        remaining -= cost
+
+    if priority is not None and len(kept_lines) < len(history):
+        result.history_dropped = len(history) - len(kept_lines)
+        result.dropped.append(f"{result.history_dropped} message(s)")
+
+    if kept_lines or result.summary_included:
+        result.history_part = header + "".join(kept_lines[i] for i in sorted(kept_lines))
+    result.profile_part = profile_part
+    result.query_part = query_part
+    result.history_included = len(kept_lines)
+    return result
+
+
+def layout_context(result: ContextResult, layout: str = "query_first") -> ContextResult:
+    """
+    Combine packed sections into the final message.
+
+    The "query_first" layout emits profile, query, then history. The
+    "prefix_stable" layout emits profile, history, then query, so each
+    turn's prompt starts with the previous turn's bytes (until history is
+    trimmed or summarized).
+    """
+    if layout == "prefix_stable":
+        # Most stable first; the query is the only part that is new every turn
+        history_part = f"{result.history_part.lstrip()}\n\n" if result.history_part else ""
+        message = result.profile_part + history_part + result.query_part
+    else:
+        message = result.profile_part + result.query_part + result.history_part
+
+    result.message = message
+    result.tokens = estimate_tokens(message)
+    return result
+
+
+def assemble_context(
+    current_message: str,
+    profile_text: str,
+    history: List[Dict[str, Any]],
+    budget: int,
+    summary_text: str = "",
+    layout: str = "query_first",
+) -> ContextResult:
+    """
+    Build the structured message within a token budget.
+
+    See pack_context for what is kept and layout_context for the order.
+
+    Args:
+        current_message: The current user query
+        profile_text: Formatted profile text ("" when no profile is active)
+        history: Prior messages, oldest first (current message excluded)
+        budget: Token budget for the whole message
+        summary_text: Rolling summary of turns older than the history window
+        layout: "query_first" or "prefix_stable"
+
+    Returns:
+        ContextResult with the message and what was dropped
+    """
+    packed = pack_context(current_message, profile_text, history, budget, summary_text)
+    return layout_context(packed, layout)
+
+
+# Sentences with figures or these terms carry the facts worth keeping
+_KEY_TERMS = re.compile(
+    r"\b(salary|income|earn|tax|regime|80c|80d|nps|ppf|elss|loan|emi|rent|invest|sip|"
+    r"mutual fund|stock|gold|fd|insurance|cover|premium|goal|retire|save|saving|expense|"
+    r"budget|age|married|child|kid|parent|house|home|car|debt|risk)\w*",
+    re.IGNORECASE,
+)
+_FIGURES = re.compile(r"[₹$%]|\d")
+
+
+def _score_sentence(sentence: str) -> int:
+    return 2 * len(_FIGURES.findall(sentence)[:3]) + len(_KEY_TERMS.findall(sentence))
+
+
+def summarize_message(msg: Dict[str, Any], max_chars: int = 200) -> Optional[str]:
+    """
+    Extract the most informative sentence of a message as one summary line.
+
+    Returns:
+        "- role: sentence" or None if the message has nothing worth keeping
+    """
+    content = re.sub(r"[#*_`>|]+", " ", msg.get("content", ""))
+    sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+|\n+", content) if s.strip()]
+    if not sentences:
+        return None
+    best = max(sentences, key=_score_sentence)
+    if _score_sentence(best) == 0 and msg.get("role") == "assistant":
+        return None  # Pleasantries and filler from the agent
+    if len(best) > max_chars:
+        best = best[: max_chars - 1].rstrip() + "…"
+    role = "you" if msg.get("role") == "assistant" else msg.get("role", "user")
+    return f"- {role}: {best}"
+
+
+def update_rolling_summary(
+    summary: Dict[str, Any], messages: List[Dict[str, Any]], upto: int
+) -> Dict[str, Any]:
+    """
+    Fold messages[summary["covered"]:upto] into the rolling summary.
+
+    Work is incremental: each message is summarized once, when it first
+    falls out of the history window. The summary is capped at
+    SUMMARY_TOKEN_BUDGET by dropping its oldest lines.
+
+    Args:
+        summary: {"lines": [...], "covered": n} from the previous turn
+        messages: The session's messages, oldest first
+        upto: Number of leading messages no longer sent verbatim
+
+    Returns:
+        The updated summary dict
+    """
+    lines = list(summary.get("lines", []))
+    covered = summary.get("covered", 0)
+    for msg in messages[covered:upto]:
+        line = summarize_message(msg)
+        if line:
+            lines.append(line)
+    while lines and estimate_tokens("\n".join(lines)) > SUMMARY_TOKEN_BUDGET:
+        lines.pop(0)
+    return {"lines": lines, "covered": max(covered, upto)}
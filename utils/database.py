@@ -6,40 +6,274 @@ Uses SQLite with JSON data storage for flexibility.
 import sqlite3
 import json
 import os
+import queue
+import threading
+import atexit
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple, Iterator, Callable, TypeVar
 
-# Database file path
-DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "users.db")
+from utils.profile_metrics import (
+    SECTION_80C_LIMIT,
+    compute_derived_metrics,
+    get_derived_metrics,
+    metric_in_sections,
+)
 
+# Database file path (FINAGENT_DB_PATH overrides it, e.g. for scratch databases)
+DB_PATH = os.environ.get("FINAGENT_DB_PATH") or os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "users.db"
+)
 
-def get_connection() -> sqlite3.Connection:
-    """Get a database connection, creating the database if needed."""
-    # Ensure data directory exists
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Rendered profile text cache: user_id -> (updated_at, {(format, sections): text}), LRU ordered
+PROFILE_TEXT_CACHE_SIZE = 1024
+_profile_text_cache: "OrderedDict[str, Tuple[str, Dict[Tuple, str]]]" = OrderedDict()
+_profile_text_lock = threading.Lock()
+# Bumped on every invalidation; a render only caches its text if no
+# invalidation happened while it was checking the stored version
+_profile_text_generation = 0
+
+
+# Idle connections kept open for reuse across calls, threads and sessions
+DB_POOL_SIZE = 8
+
+# Applied to every new connection. WAL lets readers run alongside a writer;
+# the busy timeout makes writers wait for the lock instead of failing.
+SQLITE_PRAGMAS = {
+    "busy_timeout": 5000,  # Milliseconds
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",  # Durable at checkpoints; safe with WAL
+    "cache_size": -16000,  # KiB (16 MB) of page cache per connection
+    "mmap_size": 64 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
+# Retries for writes that still hit SQLITE_BUSY after the busy timeout
+DB_BUSY_RETRIES = 3
+DB_BUSY_BACKOFF = 0.05  # Seconds, doubled per attempt
+
+T = TypeVar("T")
+
+# Scalar profile fields exposed as indexed generated columns on users:
+# column -> (declared type, JSON path into profile_data)
+PROFILE_COLUMNS = {
+    "age": ("INTEGER", "$.personal.age"),
+    "city": ("TEXT COLLATE NOCASE", "$.personal.city"),
+    "monthly_income": ("REAL", "$.income.monthly_income"),
+    "annual_income": ("REAL", "$.income.annual_income"),
+    "employment_type": ("TEXT", "$.income.employment_type"),
+    "risk_tolerance": ("TEXT", "$.savings.risk_tolerance"),
+    "retirement_age": ("INTEGER", "$.goals.retirement_age"),
+    "ownership_status": ("TEXT", "$.real_estate.ownership_status"),
+}
+
+# Generated columns need SQLite 3.31+; older versions index the
+# json_extract expressions directly and query them by expression
+GENERATED_COLUMNS_SUPPORTED = sqlite3.sqlite_version_info >= (3, 31, 0)
+
+
+def _profile_column_sql(column: str) -> str:
+    """SQL for a PROFILE_COLUMNS value: the column itself, or its json_extract expression."""
+    if GENERATED_COLUMNS_SUPPORTED:
+        return column
+    col_type, path = PROFILE_COLUMNS[column]
+    collate = " COLLATE NOCASE" if "NOCASE" in col_type else ""
+    return f"json_extract(profile_data, '{path}'){collate}"
+
+
+class ConnectionPool:
+    """
+    Pool of reusable SQLite connections to one database file.
+
+    A connection is used by one thread at a time (between acquire and
+    release), so connections are opened with check_same_thread=False and
+    handed from thread to thread. Up to `size` idle connections are kept;
+    extra connections opened under load are closed on release.
+    """
+
+    def __init__(
+        self, path: str, size: int = DB_POOL_SIZE, pragmas: Optional[Dict[str, Any]] = None
+    ):
+        self.path = path
+        self.size = size
+        self.pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._dir_ready = False
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._dir_ready:
+            # Ensure data directory exists (once per pool)
+            with self._lock:
+                if not self._dir_ready:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    self._dir_ready = True
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Take an idle connection, or open a new one if none is idle."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool (closed if the pool is full)."""
+        if self._idle.qsize() >= self.size:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a connection for the duration of a with-block.
+
+        Uncommitted work is rolled back if the block raises; a connection
+        that cannot be rolled back is discarded instead of reused.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                conn.close()
+                raise
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close_all(self):
+        """Close all idle connections (borrowed ones close on release)."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pool = ConnectionPool(DB_PATH)
+atexit.register(_pool.close_all)
+
+
+def get_connection():
+    """
+    Borrow a pooled database connection, creating the database if needed.
+
+    Use as a context manager; the connection goes back to the pool
+    afterwards, so do not close it:
+
+        with get_connection() as conn:
+            conn.execute(...)
+    """
+    return _pool.connection()
+
+
+def _is_busy(error: sqlite3.OperationalError) -> bool:
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return "locked" in str(error) or "busy" in str(error)
+
+
+def retry_on_busy(operation: Callable[[], T]) -> T:
+    """
+    Run a database operation, retrying with backoff while the database is busy.
+
+    The busy timeout already waits for locks; this covers the cases SQLite
+    reports immediately (e.g. a read transaction that cannot be upgraded
+    to a write while another writer holds the lock).
+    """
+    for attempt in range(DB_BUSY_RETRIES + 1):
+        try:
+            return operation()
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e) or attempt == DB_BUSY_RETRIES:
+                raise
+            time.sleep(DB_BUSY_BACKOFF * (2 ** attempt))
+
+
+def close_connections():
+    """Close pooled database connections (e.g. before deleting the database file)."""
+    _pool.close_all()
 
 
 def init_database():
     """Initialize the database with required tables."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            user_id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            profile_data TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            updated_at TEXT NOT NULL
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                user_id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                profile_data TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+
+        try:
+            # Generated columns are VIRTUAL so they can be added to existing tables;
+            # only their indexes store values
+            existing = {row["name"] for row in cursor.execute("PRAGMA table_xinfo(users)")}
+            for column, (col_type, path) in PROFILE_COLUMNS.items():
+                if GENERATED_COLUMNS_SUPPORTED and column not in existing:
+                    cursor.execute(f"""
+                        ALTER TABLE users ADD COLUMN {column} {col_type}
+                        GENERATED ALWAYS AS (json_extract(profile_data, '{path}')) VIRTUAL
+                    """)
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_users_{column} "
+                    f"ON users ({_profile_column_sql(column)})"
+                )
+        except sqlite3.OperationalError as e:
+            # e.g. SQLite built without JSON1; profiles still load and save
+            print(
+                f"Profile query columns unavailable (SQLite {sqlite3.sqlite_version}): {e}. "
+                "find_users will not work."
+            )
+
+        # Keyset pagination by recency and case-insensitive prefix search
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_users_updated_at ON users (updated_at, user_id)"
         )
-    """)
-    
-    conn.commit()
-    conn.close()
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_users_name_nocase ON users (name COLLATE NOCASE)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_users_user_id_nocase ON users (user_id COLLATE NOCASE)"
+        )
+
+        conn.commit()
+
+
+_UPSERT_USER_SQL = """
+    INSERT INTO users (user_id, name, profile_data, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(user_id) DO UPDATE SET
+        name = excluded.name,
+        profile_data = excluded.profile_data,
+        updated_at = excluded.updated_at
+"""
+
+
+def _profile_row(user_id: str, name: str, profile_data: Dict[str, Any], now: str) -> Tuple:
+    """Build the upsert parameters for one profile, with derived metrics attached."""
+    # Totals and ratios are computed once here and stored with the profile
+    profile_data = {**profile_data, "derived": compute_derived_metrics(profile_data)}
+    profile_json = json.dumps(profile_data, ensure_ascii=False)
+    # created_at is only used on insert; the conflict branch keeps the original
+    return (user_id, name, profile_json, now, now)
 
 
 def save_user_profile(user_id: str, name: str, profile_data: Dict[str, Any]) -> bool:
@@ -55,36 +289,51 @@ def save_user_profile(user_id: str, name: str, profile_data: Dict[str, Any]) ->
         True if successful, False otherwise
     """
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        now = datetime.now().isoformat()
-        profile_json = json.dumps(profile_data, ensure_ascii=False)
-        
-        # Check if user exists
-        cursor.execute("SELECT user_id FROM users WHERE user_id = ?", (user_id,))
-        exists = cursor.fetchone()
-        
-        if exists:
-            cursor.execute("""
-                UPDATE users 
-                SET name = ?, profile_data = ?, updated_at = ?
-                WHERE user_id = ?
-            """, (name, profile_json, now, user_id))
-        else:
-            cursor.execute("""
-                INSERT INTO users (user_id, name, profile_data, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?)
-            """, (user_id, name, profile_json, now, now))
-        
-        conn.commit()
-        conn.close()
+        row = _profile_row(user_id, name, profile_data, datetime.now().isoformat())
+
+        def write():
+            with get_connection() as conn:
+                conn.execute(_UPSERT_USER_SQL, row)
+                conn.commit()
+
+        retry_on_busy(write)
+        invalidate_profile_text(user_id)
         return True
     except Exception as e:
         print(f"Error saving user profile: {e}")
         return False
 
 
+def save_user_profiles_bulk(profiles: List[Tuple[str, str, Dict[str, Any]]]) -> bool:
+    """
+    Save or update many user profiles in a single transaction.
+    
+    Either all profiles are written or none are.
+    
+    Args:
+        profiles: (user_id, name, profile_data) tuples
+    
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        now = datetime.now().isoformat()
+        rows = [_profile_row(user_id, name, data, now) for user_id, name, data in profiles]
+
+        def write():
+            with get_connection() as conn:
+                conn.executemany(_UPSERT_USER_SQL, rows)
+                conn.commit()
+
+        retry_on_busy(write)
+        for user_id, _, _ in profiles:
+            invalidate_profile_text(user_id)
+        return True
+    except Exception as e:
+        print(f"Error saving user profiles: {e}")
+        return False
+
+
 def get_user_profile(user_id: str) -> Optional[Dict[str, Any]]:
     """
     Get a user profile by ID.
@@ -96,16 +345,13 @@ def get_user_profile(user_id: str) -> Optional[Dict[str, Any]]:
         Dictionary with user data or None if not found
     """
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT user_id, name, profile_data, created_at, updated_at
-            FROM users WHERE user_id = ?
-        """, (user_id,))
-        
-        row = cursor.fetchone()
-        conn.close()
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT user_id, name, profile_data, created_at, updated_at
+                FROM users WHERE user_id = ?
+            """, (user_id,))
+            row = cursor.fetchone()
         
         if row:
             return {
@@ -121,6 +367,33 @@ def get_user_profile(user_id: str) -> Optional[Dict[str, Any]]:
         return None
 
 
+def get_profile_version(user_id: str) -> Optional[str]:
+    """
+    Get the version (updated_at timestamp) of a user profile.
+
+    Args:
+        user_id: The user's unique identifier
+
+    Returns:
+        The profile's updated_at value or None if not found
+    """
+    with _profile_text_lock:
+        cached = _profile_text_cache.get(user_id)
+    if cached is not None:
+        return cached[0]
+
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT updated_at FROM users WHERE user_id = ?", (user_id,))
+            row = cursor.fetchone()
+
+        return row["updated_at"] if row else None
+    except Exception as e:
+        print(f"Error getting profile version: {e}")
+        return None
+
+
 def get_all_users() -> List[Dict[str, Any]]:
     """
     Get all users (basic info only for selection dropdowns).
@@ -129,17 +402,14 @@ def get_all_users() -> List[Dict[str, Any]]:
         List of dictionaries with user_id and name
     """
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT user_id, name, updated_at
-            FROM users
-            ORDER BY updated_at DESC
-        """)
-        
-        rows = cursor.fetchall()
-        conn.close()
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT user_id, name, updated_at
+                FROM users
+                ORDER BY updated_at DESC
+            """)
+            rows = cursor.fetchall()
         
         return [
             {"user_id": row["user_id"], "name": row["name"], "updated_at": row["updated_at"]}
@@ -150,6 +420,127 @@ def get_all_users() -> List[Dict[str, Any]]:
         return []
 
 
+def list_users(
+    limit: int = 50,
+    after: Optional[Tuple[str, str]] = None,
+    search: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, str]]]:
+    """
+    Get one page of users, most recently updated first.
+
+    Pages are keyed on (updated_at, user_id) rather than an offset, so each
+    page is an index seek however deep it is.
+
+    Args:
+        limit: Maximum users to return
+        after: Cursor returned with the previous page (None for the first page)
+        search: Case-insensitive prefix of the name or user_id to match
+
+    Returns:
+        Tuple of (users with user_id, name and updated_at, cursor for the
+        next page or None if this is the last page)
+    """
+    conditions = []
+    params: List[Any] = []
+    if search:
+        # Prefix match as an index range: [prefix, prefix + highest code point)
+        upper = search + "\U0010ffff"
+        conditions.append("""(
+            (name >= ? COLLATE NOCASE AND name < ? COLLATE NOCASE)
+            OR (user_id >= ? COLLATE NOCASE AND user_id < ? COLLATE NOCASE)
+        )""")
+        params += [search, upper, search, upper]
+    if after is not None:
+        conditions.append("(updated_at, user_id) < (?, ?)")
+        params += list(after)
+    where = " AND ".join(conditions) or "1"
+
+    try:
+        with get_connection() as conn:
+            rows = conn.execute(f"""
+                SELECT user_id, name, updated_at
+                FROM users
+                WHERE {where}
+                ORDER BY updated_at DESC, user_id DESC
+                LIMIT ?
+            """, [*params, limit + 1]).fetchall()
+
+        users = [
+            {"user_id": row["user_id"], "name": row["name"], "updated_at": row["updated_at"]}
+            for row in rows[:limit]
+        ]
+        next_cursor = None
+        if len(rows) > limit and users:
+            next_cursor = (users[-1]["updated_at"], users[-1]["user_id"])
+        return users, next_cursor
+    except Exception as e:
+        print(f"Error listing users: {e}")
+        return [], None
+
+
+def find_users(
+    min_age: Optional[int] = None,
+    max_age: Optional[int] = None,
+    city: Optional[str] = None,
+    min_monthly_income: Optional[float] = None,
+    max_monthly_income: Optional[float] = None,
+    min_annual_income: Optional[float] = None,
+    max_annual_income: Optional[float] = None,
+    employment_type: Optional[str] = None,
+    risk_tolerance: Optional[str] = None,
+    min_retirement_age: Optional[int] = None,
+    max_retirement_age: Optional[int] = None,
+    ownership_status: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Find users matching all given profile filters.
+
+    Filters run against the indexed PROFILE_COLUMNS, so no profile JSON is
+    loaded or parsed. Bounds are inclusive; city matches case-insensitively.
+    Filters left as None are ignored.
+
+    Returns:
+        List of matching users (user_id, name, timestamps and the
+        PROFILE_COLUMNS values), ordered by name
+    """
+    conditions = [
+        ("age", ">=", min_age),
+        ("age", "<=", max_age),
+        ("city", "=", city),
+        ("monthly_income", ">=", min_monthly_income),
+        ("monthly_income", "<=", max_monthly_income),
+        ("annual_income", ">=", min_annual_income),
+        ("annual_income", "<=", max_annual_income),
+        ("employment_type", "=", employment_type),
+        ("risk_tolerance", "=", risk_tolerance),
+        ("retirement_age", ">=", min_retirement_age),
+        ("retirement_age", "<=", max_retirement_age),
+        ("ownership_status", "=", ownership_status),
+    ]
+    active = [cond for cond in conditions if cond[2] is not None]
+    where = " AND ".join(f"{_profile_column_sql(col)} {op} ?" for col, op, _ in active) or "1"
+    params = [value for _, _, value in active]
+    columns = ", ".join(f"{_profile_column_sql(col)} AS {col}" for col in PROFILE_COLUMNS)
+    query = f"""
+        SELECT user_id, name, created_at, updated_at, {columns}
+        FROM users
+        WHERE {where}
+        ORDER BY name
+    """
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    try:
+        with get_connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+    except Exception as e:
+        print(f"Error finding users: {e}")
+        return []
+
+
 def delete_user(user_id: str) -> bool:
     """
     Delete a user profile.
@@ -161,34 +552,174 @@ def delete_user(user_id: str) -> bool:
         True if successful, False otherwise
     """
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
-        
-        conn.commit()
-        conn.close()
+        def write():
+            with get_connection() as conn:
+                conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
+                conn.commit()
+
+        retry_on_busy(write)
+        invalidate_profile_text(user_id)
         return True
     except Exception as e:
         print(f"Error deleting user: {e}")
         return False
 
 
-def format_user_profile_for_agent(user_data: Dict[str, Any]) -> str:
+def invalidate_profile_text(user_id: str):
+    """Drop a user's cached profile text (called whenever the profile changes)."""
+    global _profile_text_generation
+    with _profile_text_lock:
+        _profile_text_cache.pop(user_id, None)
+        _profile_text_generation += 1
+
+
+def _profile_variant(profile_format: str, sections: Optional[List[str]]) -> Tuple:
+    return (profile_format, tuple(sorted(sections)) if sections is not None else None)
+
+
+def get_cached_profile_text(
+    user_id: str, profile_format: str = "verbose", sections: Optional[List[str]] = None
+) -> Optional[str]:
+    """Get already rendered profile text from the cache (None on a miss)."""
+    variant = _profile_variant(profile_format, sections)
+    with _profile_text_lock:
+        cached = _profile_text_cache.get(user_id)
+        if cached is not None and variant in cached[1]:
+            _profile_text_cache.move_to_end(user_id)
+            return cached[1][variant]
+    return None
+
+
+def render_profile_text(
+    user_data: Dict[str, Any],
+    profile_format: str = "verbose",
+    sections: Optional[List[str]] = None,
+) -> str:
+    """
+    Render a loaded profile and store the text in the profile text cache.
+
+    The text is only cached if user_data is still the stored version, so a
+    save racing with the render cannot leave stale text (or a stale
+    version for get_profile_version) in the cache.
+
+    Args:
+        user_data: The complete user data dictionary (from get_user_profile)
+        profile_format: "verbose" or "compact" (see PROFILE_RENDERERS)
+        sections: Profile sections to include (None for all)
+
+    Returns:
+        Formatted profile string
+    """
+    variant = _profile_variant(profile_format, sections)
+    user_id = user_data["user_id"]
+    text = PROFILE_RENDERERS[profile_format](user_data, sections)
+
+    # Saves invalidate after committing: either the re-check below sees the
+    # new version, or the invalidation bumps the generation before we insert
+    with _profile_text_lock:
+        generation = _profile_text_generation
+    try:
+        with get_connection() as conn:
+            row = conn.execute(
+                "SELECT updated_at FROM users WHERE user_id = ?", (user_id,)
+            ).fetchone()
+    except Exception as e:
+        print(f"Error checking profile version: {e}")
+        return text
+    if row is None or row["updated_at"] != user_data["updated_at"]:
+        return text
+
+    with _profile_text_lock:
+        if generation != _profile_text_generation:
+            return text
+        cached = _profile_text_cache.get(user_id)
+        if cached is not None and cached[0] == user_data["updated_at"]:
+            cached[1][variant] = text
+        else:
+            _profile_text_cache[user_id] = (user_data["updated_at"], {variant: text})
+        _profile_text_cache.move_to_end(user_id)
+        while len(_profile_text_cache) > PROFILE_TEXT_CACHE_SIZE:
+            _profile_text_cache.popitem(last=False)
+    return text
+
+
+def get_formatted_profile(
+    user_id: str, profile_format: str = "verbose", sections: Optional[List[str]] = None
+) -> str:
+    """
+    Get the agent-ready profile text for a user, rendered once per profile version.
+
+    The text is cached process-wide keyed by user_id, updated_at, format
+    and section selection; save_user_profile and delete_user invalidate
+    the entry, so repeated chat turns skip the database read, JSON parse
+    and formatting.
+
+    Args:
+        user_id: The user's unique identifier
+        profile_format: "verbose" or "compact" (see PROFILE_RENDERERS)
+        sections: Profile sections to include (None for all)
+
+    Returns:
+        Formatted profile string, or "" if the user does not exist
+    """
+    text = get_cached_profile_text(user_id, profile_format, sections)
+    if text is not None:
+        return text
+
+    user_data = get_user_profile(user_id)
+    if not user_data:
+        return ""
+    return render_profile_text(user_data, profile_format, sections)
+
+
+def _select_sections(profile: Dict[str, Any], sections: Optional[List[str]]) -> Dict[str, Any]:
+    """Restrict profile data to the given top-level sections (None keeps all)."""
+    if sections is None:
+        return profile
+    return {key: value for key, value in profile.items() if key in sections}
+
+
+def _format_pct(value: Optional[float]) -> str:
+    return "N/A" if value is None else f"{value:.1f}%"
+
+
+def _format_multiple(value: Optional[float], unit: str = "x") -> str:
+    return "N/A" if value is None else f"{value:.1f}{unit}"
+
+
+def format_user_profile_for_agent(
+    user_data: Dict[str, Any], sections: Optional[List[str]] = None
+) -> str:
     """
     Format user profile data into a readable string for the agent.
     
     Args:
         user_data: The complete user data dictionary
+        sections: Profile sections to include (None for all)
     
     Returns:
-        Formatted string with all profile information
+        Formatted string with the selected profile information
     """
     if not user_data:
         return ""
     
-    profile = user_data.get("profile_data", {})
+    derived = get_derived_metrics(user_data.get("profile_data", {}))
+    profile = _select_sections(user_data.get("profile_data", {}), sections)
     name = user_data.get("name", "User")
+    # Ratios are only shown when the agent also receives their source sections
+    ratio_lines = [
+        line
+        for metric, line in [
+            ("savings_rate_pct", f"- Savings Rate: {_format_pct(derived['savings_rate_pct'])}"),
+            ("total_portfolio", f"- Total Portfolio: ₹{derived['total_portfolio']:,.0f}"),
+            ("foir_pct", f"- FOIR (EMIs / Income): {_format_pct(derived['foir_pct'])}"),
+            ("insurance_multiple",
+             f"- Life Cover Multiple: {_format_multiple(derived['insurance_multiple'])} annual income"),
+            ("emergency_fund_months",
+             f"- Emergency Fund: {_format_multiple(derived['emergency_fund_months'], ' months')} of expenses"),
+        ]
+        if metric_in_sections(metric, sections)
+    ]
     
     sections = []
     
@@ -220,19 +751,8 @@ def format_user_profile_for_agent(user_data: Dict[str, Any]) -> str:
     # Monthly Expenses
     expenses = profile.get("expenses", {})
     if expenses:
-        total_expenses = sum([
-            expenses.get('housing', 0),
-            expenses.get('food', 0),
-            expenses.get('transportation', 0),
-            expenses.get('utilities', 0),
-            expenses.get('healthcare', 0),
-            expenses.get('education', 0),
-            expenses.get('entertainment', 0),
-            expenses.get('emi_payments', 0),
-            expenses.get('other', 0)
-        ])
         sections.append(f"""
-📊 MONTHLY EXPENSES (Total: ₹{total_expenses:,.0f}):
+📊 MONTHLY EXPENSES (Total: ₹{derived['total_monthly_expenses']:,.0f}):
 - Housing/Rent: ₹{expenses.get('housing', 0):,.0f}
 - Food & Groceries: ₹{expenses.get('food', 0):,.0f}
 - Transportation: ₹{expenses.get('transportation', 0):,.0f}
@@ -277,18 +797,9 @@ def format_user_profile_for_agent(user_data: Dict[str, Any]) -> str:
     # Tax Planning (80C, 80D, 80CCD)
     tax = profile.get("tax", {})
     if tax:
-        total_80c = sum([
-            tax.get('ppf_contribution', 0),
-            tax.get('elss_investment', 0),
-            tax.get('life_insurance_premium', 0),
-            tax.get('epf_contribution', 0),
-            tax.get('home_loan_principal', 0),
-            tax.get('children_tuition', 0),
-            tax.get('sukanya_samriddhi', 0)
-        ])
         sections.append(f"""
 📑 TAX PLANNING:
-Section 80C (Total: ₹{min(total_80c, 150000):,.0f} / ₹1,50,000):
+Section 80C (Total: ₹{derived['claimed_80c']:,.0f} / ₹1,50,000):
 - PPF Contribution: ₹{tax.get('ppf_contribution', 0):,.0f}
 - ELSS Investment: ₹{tax.get('elss_investment', 0):,.0f}
 - Life Insurance Premium: ₹{tax.get('life_insurance_premium', 0):,.0f}
@@ -339,11 +850,184 @@ Section 80CCD (NPS):
         sections.append(f"""
 📝 ADDITIONAL INFORMATION:
 {additional}
+""")
+
+    # Key ratios (precomputed at save time)
+    if ratio_lines:
+        ratio_text = "\n".join(ratio_lines)
+        sections.append(f"""
+📈 KEY RATIOS:
+{ratio_text}
 """)
     
     return "\n".join(sections)
 
 
+def _compact_fields(pairs: List[Tuple[str, Any]]) -> str:
+    """Join key=value pairs, dropping zero, empty and N/A values."""
+    kept = []
+    for key, value in pairs:
+        if value in (None, "", 0, False, "N/A"):
+            continue
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if isinstance(value, str) and any(ch in value for ch in ";=\n"):
+            value = json.dumps(value, ensure_ascii=False)
+        kept.append(f"{key}={value}")
+    return "; ".join(kept)
+
+
+def format_user_profile_compact(
+    user_data: Dict[str, Any], sections: Optional[List[str]] = None
+) -> str:
+    """
+    Format user profile data as terse key=value lines for the agent.
+
+    Zero, empty and N/A fields are dropped and amounts are plain INR
+    numbers; totals (expenses, portfolio, capped 80C) are kept so the
+    agent does not have to add them up. Sections with nothing left are
+    omitted entirely.
+
+    Args:
+        user_data: The complete user data dictionary
+        sections: Profile sections to include (None for all)
+
+    Returns:
+        Compact profile string
+    """
+    if not user_data:
+        return ""
+
+    derived = get_derived_metrics(user_data.get("profile_data", {}))
+    profile = _select_sections(user_data.get("profile_data", {}), sections)
+    lines = ["(amounts in INR; expenses/EMIs/rent/SIP monthly, premiums yearly)"]
+
+    def add(label: str, pairs: List[Tuple[str, Any]]):
+        fields = _compact_fields(pairs)
+        if fields:
+            lines.append(f"{label}: {fields}")
+
+    personal = profile.get("personal", {})
+    add("personal", [
+        ("name", user_data.get("name")),
+        ("age", personal.get("age")),
+        ("gender", personal.get("gender")),
+        ("marital", personal.get("marital_status")),
+        ("dependents", personal.get("dependents")),
+        ("city", personal.get("city")),
+    ])
+
+    income = profile.get("income", {})
+    add("income", [
+        ("monthly", income.get("monthly_income")),
+        ("annual", income.get("annual_income")),
+        ("employment", income.get("employment_type")),
+        ("stability", income.get("job_stability")),
+        ("industry", income.get("industry")),
+    ])
+
+    expenses = profile.get("expenses", {})
+    expense_keys = [
+        ("housing", "housing"), ("food", "food"), ("transport", "transportation"),
+        ("utilities", "utilities"), ("health", "healthcare"), ("education", "education"),
+        ("fun", "entertainment"), ("emi", "emi_payments"), ("other", "other"),
+    ]
+    add("expenses", [("total", derived["total_monthly_expenses"] if expenses else 0)] + [
+        (short, expenses.get(key)) for short, key in expense_keys
+    ])
+
+    insurance = profile.get("insurance", {})
+    add("insurance", [
+        ("life_cover", insurance.get("life_insurance")),
+        ("health_cover", insurance.get("health_insurance")),
+        ("term_cover", insurance.get("term_insurance")),
+        ("health_premium", insurance.get("health_premium")),
+        ("life_premium", insurance.get("life_premium")),
+    ])
+
+    savings = profile.get("savings", {})
+    savings_keys = [
+        ("emergency", "emergency_fund"), ("fd", "fixed_deposits"), ("mf", "mutual_funds"),
+        ("stocks", "stocks"), ("ppf", "ppf"), ("nps", "nps"), ("epf", "epf"),
+        ("gold", "gold"), ("real_estate", "real_estate"), ("other", "other"),
+    ]
+    add("savings", [("total", derived["total_portfolio"] if savings else 0)] + [
+        (short, savings.get(key)) for short, key in savings_keys
+    ] + [("risk", savings.get("risk_tolerance"))])
+
+    tax = profile.get("tax", {})
+    keys_80c = [
+        ("ppf", "ppf_contribution"), ("elss", "elss_investment"),
+        ("life_premium", "life_insurance_premium"), ("epf", "epf_contribution"),
+        ("home_principal", "home_loan_principal"), ("tuition", "children_tuition"),
+        ("ssy", "sukanya_samriddhi"),
+    ]
+    has_80c = bool(tax) and derived["total_80c"] > 0
+    add("tax_80c", [
+        ("used", derived["claimed_80c"] if has_80c else 0),
+        ("limit", SECTION_80C_LIMIT if has_80c else 0),
+    ] + [
+        (short, tax.get(key)) for short, key in keys_80c
+    ])
+    add("tax_80d", [
+        ("self", tax.get("health_premium_self")),
+        ("parents", tax.get("health_premium_parents")),
+        ("parents_senior", tax.get("parents_senior")),
+    ])
+    add("tax_80ccd", [
+        ("nps_1b", tax.get("nps_contribution")),
+        ("employer_nps", tax.get("employer_nps")),
+    ])
+
+    real_estate = profile.get("real_estate", {})
+    has_loan = bool(real_estate.get("home_loan_outstanding"))
+    add("real_estate", [
+        ("status", real_estate.get("ownership_status")),
+        ("rent", real_estate.get("current_rent")),
+        ("property_value", real_estate.get("property_value")),
+        ("loan_outstanding", real_estate.get("home_loan_outstanding")),
+        ("loan_emi", real_estate.get("home_loan_emi")),
+        # Rate and tenure default to non-zero values; only meaningful with a loan
+        ("loan_rate_pct", real_estate.get("loan_interest_rate") if has_loan else None),
+        ("loan_months_left", real_estate.get("loan_tenure_remaining") if has_loan else None),
+    ])
+
+    goals = profile.get("goals", {})
+    add("goals", [
+        ("short", goals.get("short_term")),
+        ("medium", goals.get("medium_term")),
+        ("long", goals.get("long_term")),
+        ("retire_age", goals.get("retirement_age")),
+        ("sip_target", goals.get("sip_target")),
+    ])
+
+    additional = profile.get("additional_info", "")
+    if additional:
+        lines.append(f"notes: {additional.strip()}")
+
+    add("ratios", [
+        (key, derived[metric])
+        for key, metric in [
+            ("savings_rate_pct", "savings_rate_pct"),
+            ("portfolio", "total_portfolio"),
+            ("foir_pct", "foir_pct"),
+            ("life_cover_x_income", "insurance_multiple"),
+            ("emergency_months", "emergency_fund_months"),
+        ]
+        # Only ratios whose source sections the agent receives
+        if metric_in_sections(metric, sections)
+    ])
+
+    return "\n".join(lines)
+
+
+# Profile text renderers selectable per agent/team (see PROFILE_FORMATS in config)
+PROFILE_RENDERERS = {
+    "verbose": format_user_profile_for_agent,
+    "compact": format_user_profile_compact,
+}
+
+
 # Initialize database on module import
 init_database()
 
@@ -0,0 +1,126 @@
+"""
+BM25 index over a chat session's messages.
+Lets the prompt builder pull in earlier turns relevant to the current query
+(e.g. a salary figure stated twenty turns ago) without an embedding service.
+"""
+
+import re
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+
+# Words too common in this domain's chats to say anything about relevance
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from how i if in is it its me my "
+    "of on or should so that the this to was what when which will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word/number tokens with stopwords removed."""
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class HistoryIndex:
+    """
+    Incremental BM25 index where each document is one chat message.
+
+    Messages are append-only within a session, so documents are only ever
+    added; scoring is vectorized over all documents with NumPy.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._term_freqs: List[Counter] = []
+        self._doc_freqs: Counter = Counter()
+        self._lengths: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._term_freqs)
+
+    def add(self, text: str) -> int:
+        """Index one document and return its position."""
+        terms = Counter(tokenize(text))
+        self._term_freqs.append(terms)
+        self._doc_freqs.update(terms.keys())
+        self._lengths.append(sum(terms.values()))
+        return len(self._term_freqs) - 1
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every indexed document against the query."""
+        n_docs = len(self._term_freqs)
+        query_terms = [t for t in set(tokenize(query)) if t in self._doc_freqs]
+        if n_docs == 0 or not query_terms:
+            return np.zeros(n_docs)
+
+        tf = np.array(
+            [[doc.get(term, 0) for doc in self._term_freqs] for term in query_terms],
+            dtype=float,
+        )
+        df = np.array([self._doc_freqs[term] for term in query_terms], dtype=float)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+
+        lengths = np.array(self._lengths, dtype=float)
+        avg_length = lengths.mean() or 1.0
+        norm = self.k1 * (1 - self.b + self.b * lengths / avg_length)
+        return (idf[:, None] * tf * (self.k1 + 1) / (tf + norm)).sum(axis=0)
+
+    def top_k(self, query: str, k: int, limit: int) -> List[int]:
+        """
+        Positions of the k best-matching documents among the first `limit`.
+
+        Documents with no matching terms are never returned.
+        """
+        scores = self.scores(query)[:limit]
+        if k <= 0 or scores.size == 0:
+            return []
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [int(i) for i in order if scores[i] > 0]
+
+
+def select_history(
+    index: HistoryIndex,
+    messages: List[Dict[str, Any]],
+    query: str,
+    recent: int,
+    top_k: int,
+) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """
+    Pick the most recent messages plus the earlier turns most relevant to the query.
+
+    A retrieved message brings its turn partner along (a user question
+    with the reply that follows it, or a reply with its question), so
+    the agent never sees half an exchange.
+
+    Args:
+        index: Index covering messages (positions match list indexes)
+        messages: Prior messages, oldest first
+        query: The current user query
+        recent: Number of trailing messages always kept
+        top_k: Number of earlier messages to retrieve by relevance
+
+    Returns:
+        Tuple of (the selected messages, oldest first; positions within
+        them of the retrieved messages by score, each followed by its
+        partner), the latter for pack_context's priority
+    """
+    cutoff = max(0, len(messages) - recent)
+    picked = set(range(cutoff, len(messages)))
+    retrieved = []
+
+    for pos in index.top_k(query, top_k, cutoff):
+        picked.add(pos)
+        retrieved.append(pos)
+        role = messages[pos].get("role")
+        partner = pos + 1 if role == "user" else pos - 1
+        if 0 <= partner < len(messages) and messages[partner].get("role") != role:
+            picked.add(partner)
+            retrieved.append(partner)
+
+    order = sorted(picked)
+    position = {pos: i for i, pos in enumerate(order)}
+    return [messages[i] for i in order], [position[pos] for pos in retrieved]
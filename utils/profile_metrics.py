@@ -0,0 +1,106 @@
+"""
+Derived financial metrics for a user profile.
+Computed once when a profile is saved and stored under profile_data["derived"],
+so the profile page and agent prompts read ready-made totals and ratios.
+"""
+
+from typing import Any, Dict, List, Optional
+
+SECTION_80C_LIMIT = 150000
+FOIR_LIMIT = 0.4  # EMIs should stay within 40% of monthly income
+LIFE_COVER_MULTIPLE = 15  # Recommended life cover: 15x annual income
+
+EXPENSE_FIELDS = [
+    "housing", "food", "transportation", "utilities", "healthcare",
+    "education", "entertainment", "emi_payments", "other",
+]
+PORTFOLIO_FIELDS = [
+    "emergency_fund", "fixed_deposits", "mutual_funds", "stocks", "ppf",
+    "nps", "epf", "gold", "real_estate", "other",
+]
+SECTION_80C_FIELDS = [
+    "ppf_contribution", "elss_investment", "life_insurance_premium", "epf_contribution",
+    "home_loan_principal", "children_tuition", "sukanya_samriddhi",
+]
+
+# Profile sections each metric is computed from
+METRIC_SECTIONS = {
+    "total_monthly_expenses": ("expenses",),
+    "monthly_surplus": ("income", "expenses"),
+    "savings_rate_pct": ("income", "expenses"),
+    "total_portfolio": ("savings",),
+    "total_80c": ("tax",),
+    "claimed_80c": ("tax",),
+    "remaining_80c": ("tax",),
+    "total_emi": ("expenses", "real_estate"),
+    "foir_pct": ("income", "expenses", "real_estate"),
+    "max_affordable_emi": ("income",),
+    "total_life_cover": ("insurance",),
+    "recommended_life_cover": ("income",),
+    "life_cover_pct_of_recommended": ("income", "insurance"),
+    "insurance_multiple": ("income", "insurance"),
+    "emergency_fund_months": ("savings", "expenses"),
+}
+
+
+def _ratio(numerator: float, denominator: float, scale: float = 1.0) -> Optional[float]:
+    """numerator / denominator rounded to one decimal, or None if undefined."""
+    if not denominator:
+        return None
+    return round(numerator / denominator * scale, 1)
+
+
+def compute_derived_metrics(profile_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compute totals and ratios from raw profile data.
+
+    Ratios whose denominator is zero (e.g. FOIR without income) are None.
+
+    Args:
+        profile_data: Profile dictionary as built by the profile form
+
+    Returns:
+        Dictionary of derived metrics
+    """
+    income = profile_data.get("income", {})
+    expenses = profile_data.get("expenses", {})
+    insurance = profile_data.get("insurance", {})
+    savings = profile_data.get("savings", {})
+    tax = profile_data.get("tax", {})
+    real_estate = profile_data.get("real_estate", {})
+
+    monthly_income = income.get("monthly_income", 0)
+    annual_income = income.get("annual_income", monthly_income * 12)
+    total_expenses = sum(expenses.get(f, 0) for f in EXPENSE_FIELDS)
+    total_80c = sum(tax.get(f, 0) for f in SECTION_80C_FIELDS)
+    total_emi = expenses.get("emi_payments", 0) + real_estate.get("home_loan_emi", 0)
+    total_life_cover = insurance.get("life_insurance", 0) + insurance.get("term_insurance", 0)
+    recommended_cover = annual_income * LIFE_COVER_MULTIPLE
+
+    return {
+        "total_monthly_expenses": total_expenses,
+        "monthly_surplus": monthly_income - total_expenses,
+        "savings_rate_pct": _ratio(monthly_income - total_expenses, monthly_income, 100),
+        "total_portfolio": sum(savings.get(f, 0) for f in PORTFOLIO_FIELDS),
+        "total_80c": total_80c,
+        "claimed_80c": min(total_80c, SECTION_80C_LIMIT),
+        "remaining_80c": max(0, SECTION_80C_LIMIT - total_80c),
+        "total_emi": total_emi,
+        "foir_pct": _ratio(total_emi, monthly_income, 100),
+        "max_affordable_emi": monthly_income * FOIR_LIMIT,
+        "total_life_cover": total_life_cover,
+        "recommended_life_cover": recommended_cover,
+        "life_cover_pct_of_recommended": _ratio(total_life_cover, recommended_cover, 100),
+        "insurance_multiple": _ratio(total_life_cover, annual_income),
+        "emergency_fund_months": _ratio(savings.get("emergency_fund", 0), total_expenses),
+    }
+
+
+def metric_in_sections(metric: str, sections: Optional[List[str]]) -> bool:
+    """Whether all sections a metric is derived from are included (None includes all)."""
+    return sections is None or all(s in sections for s in METRIC_SECTIONS[metric])
+
+
+def get_derived_metrics(profile_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Stored derived metrics, computed on the fly for profiles saved before they existed."""
+    return profile_data.get("derived") or compute_derived_metrics(profile_data)
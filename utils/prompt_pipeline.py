@@ -0,0 +1,215 @@
+"""
+Prompt assembly pipeline.
+Builds the structured agent message in named stages - profile fetch, profile
+render, history selection, compression and final layout - and records the
+time and output size of each, so pre-request latency can be attributed.
+"""
+
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from config.config import (
+    PROMPT_PIPELINE,
+    PROMPT_PIPELINES,
+    HISTORY_RECENT_MESSAGES,
+    HISTORY_RETRIEVAL_TOP_K,
+)
+from utils.context import (
+    ContextResult,
+    get_context_layout,
+    get_history_mode,
+    get_profile_format,
+    get_profile_sections,
+    get_token_budget,
+    layout_context,
+    pack_context,
+    update_rolling_summary,
+)
+from utils.database import get_cached_profile_text, get_user_profile, render_profile_text
+from utils.history_index import HistoryIndex, select_history
+
+
+@dataclass
+class PromptState:
+    """
+    Inputs and intermediate results of one prompt build.
+
+    The caller fills the inputs from session state and reads back the
+    message, the updated summary/index and the stage metrics; stages never
+    touch Streamlit state themselves.
+    """
+
+    current_message: str
+    messages: List[Dict[str, Any]]
+    target_id: Optional[str] = None
+    item: Optional[Dict[str, Any]] = None
+    item_type: Optional[str] = None
+    user_id: Optional[str] = None
+    max_history: Optional[int] = None
+    # Rolling summary {"lines", "covered"}; None disables summarization
+    summary: Optional[Dict[str, Any]] = None
+    # BM25 index over messages, used in retrieval mode
+    index: Optional[HistoryIndex] = None
+
+    # Stage outputs
+    user_data: Optional[Dict[str, Any]] = None
+    profile_text: Optional[str] = None
+    history_messages: List[Dict[str, Any]] = field(default_factory=list)
+    history: List[Dict[str, Any]] = field(default_factory=list)
+    # Positions in history packed first (retrieval mode)
+    history_priority: Optional[List[int]] = None
+    context: Optional[ContextResult] = None
+    metrics: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def message(self) -> str:
+        return self.context.message if self.context else ""
+
+    @property
+    def sections(self) -> Optional[List[str]]:
+        return get_profile_sections(self.target_id, self.item, self.item_type)
+
+
+def _chars(messages: List[Dict[str, Any]]) -> int:
+    return sum(len(msg.get("content", "")) for msg in messages)
+
+
+def profile_fetch(state: PromptState) -> int:
+    """Load the active profile, unless its rendered text is already cached."""
+    if not state.user_id:
+        return 0
+    cached = get_cached_profile_text(
+        state.user_id, get_profile_format(state.target_id), state.sections
+    )
+    if cached is not None:
+        state.profile_text = cached
+        return len(cached)
+    state.user_data = get_user_profile(state.user_id)
+    if not state.user_data:
+        return 0
+    return len(json.dumps(state.user_data["profile_data"], ensure_ascii=False))
+
+
+def profile_render(state: PromptState) -> int:
+    """Render the fetched profile in the target's format and sections."""
+    if state.profile_text is None and state.user_data:
+        state.profile_text = render_profile_text(
+            state.user_data, get_profile_format(state.target_id), state.sections
+        )
+    return len(state.profile_text or "")
+
+
+def history_selection(state: PromptState) -> int:
+    """Pick the candidate history messages for the target's history mode."""
+    messages = state.messages
+    # If the current message was already added, exclude it from history
+    if (
+        messages
+        and messages[-1].get("role") == "user"
+        and messages[-1].get("content") == state.current_message
+    ):
+        messages = messages[:-1]
+    if state.max_history is not None:
+        messages = messages[-state.max_history:] if state.max_history > 0 else []
+    state.history_messages = messages
+
+    if get_history_mode(state.target_id) == "retrieval":
+        # Index new messages incrementally; messages are append-only
+        if state.index is None:
+            state.index = HistoryIndex()
+        for msg in messages[len(state.index):]:
+            state.index.add(msg.get("content", ""))
+        state.history, state.history_priority = select_history(
+            state.index,
+            messages,
+            state.current_message,
+            HISTORY_RECENT_MESSAGES,
+            HISTORY_RETRIEVAL_TOP_K,
+        )
+        # Retrieval replaces the rolling summary
+        state.summary = None
+    elif state.summary is not None:
+        # Messages already folded into the summary are not candidates
+        state.history = messages[state.summary["covered"]:]
+    else:
+        state.history = messages
+    return _chars(state.history)
+
+
+def compression(state: PromptState) -> int:
+    """
+    Pack profile, summary and history into the token budget.
+
+    In window mode, messages that do not fit are folded into the rolling
+    summary and the context is re-packed (the summary is capped, so this
+    settles after a pass or two).
+    """
+    budget = get_token_budget(state.target_id)
+    while True:
+        state.context = pack_context(
+            state.current_message,
+            state.profile_text or "",
+            state.history,
+            budget,
+            summary_text="\n".join(state.summary["lines"]) if state.summary else "",
+            priority=state.history_priority,
+        )
+        if state.summary is None or state.context.history_dropped == 0:
+            break
+        upto = state.summary["covered"] + state.context.history_dropped
+        state.summary = update_rolling_summary(state.summary, state.history_messages, upto)
+        state.history = state.history_messages[state.summary["covered"]:]
+    return len(state.context.history_part) + len(state.context.profile_part)
+
+
+def layout(state: PromptState) -> int:
+    """Order the packed sections into the final message."""
+    if state.context is None:
+        # Compression disabled: pack without summarization
+        state.context = pack_context(
+            state.current_message,
+            state.profile_text or "",
+            state.history,
+            get_token_budget(state.target_id),
+            priority=state.history_priority,
+        )
+    layout_context(state.context, get_context_layout(state.target_id))
+    return len(state.context.message)
+
+
+STAGES: Dict[str, Callable[[PromptState], int]] = {
+    "profile_fetch": profile_fetch,
+    "profile_render": profile_render,
+    "history_selection": history_selection,
+    "compression": compression,
+    "layout": layout,
+}
+
+
+def get_pipeline(target_id: Optional[str]) -> List[str]:
+    """Get the prompt stages for an agent/team (falls back to the default)."""
+    stages = PROMPT_PIPELINES.get(target_id, PROMPT_PIPELINE)
+    # Layout always runs; without it there is no message
+    return stages if "layout" in stages else [*stages, "layout"]
+
+
+def run_pipeline(state: PromptState) -> PromptState:
+    """
+    Run the target's prompt stages in order, timing each one.
+
+    Each stage appends {"stage", "ms", "chars"} to state.metrics, where
+    chars is the size of the stage's output.
+    """
+    for name in get_pipeline(state.target_id):
+        started = time.perf_counter()
+        size = STAGES[name](state)
+        state.metrics.append(
+            {
+                "stage": name,
+                "ms": round((time.perf_counter() - started) * 1000, 3),
+                "chars": size,
+            }
+        )
+    return state
@@ -0,0 +1,212 @@
+"""
+Persistent cache for repeatable agent/team responses.
+Uses SQLite next to the users database, with TTL and LRU eviction.
+"""
+
+import atexit
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Optional, Dict, Any
+
+from config.config import (
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_ALLOWLIST,
+    RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    SESSION_CONTEXT_MODE,
+)
+from utils.database import DB_PATH, ConnectionPool
+
+# Cache file lives next to users.db
+CACHE_DB_PATH = os.path.join(os.path.dirname(DB_PATH), "response_cache.db")
+
+
+_pool = ConnectionPool(CACHE_DB_PATH)
+atexit.register(_pool.close_all)
+
+# The cache database is only created once the cache is actually used
+_initialized = False
+_init_lock = threading.Lock()
+
+
+def get_connection():
+    """Borrow a pooled cache database connection (use as a context manager)."""
+    if not _initialized:
+        init_cache()
+    return _pool.connection()
+
+
+def init_cache():
+    """Initialize the cache database with required tables (once per process)."""
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        with _pool.connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    cache_key TEXT PRIMARY KEY,
+                    target_id TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    total_tokens INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                )
+            """)
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used_at)"
+            )
+
+            conn.commit()
+        _initialized = True
+
+
+def is_cacheable(target_id: str) -> bool:
+    """Whether responses from this agent/team may be served from the cache."""
+    # In session context mode the message omits the conversation the backend
+    # holds, and a cache hit would skip the backend session entirely
+    if SESSION_CONTEXT_MODE:
+        return False
+    return RESPONSE_CACHE_ENABLED and target_id in RESPONSE_CACHE_ALLOWLIST
+
+
+def make_cache_key(
+    target_id: str, item_type: str, structured_message: str, profile_version: Optional[str]
+) -> str:
+    """
+    Build the cache key for a request.
+
+    Args:
+        target_id: The ID of the agent or team
+        item_type: Either "agent" or "team"
+        structured_message: The message built by build_message_with_history
+        profile_version: The active profile's updated_at (None without a profile)
+
+    Returns:
+        Hex digest identifying the request
+    """
+    # Normalize whitespace and case so trivially different messages share an entry
+    normalized = re.sub(r"\s+", " ", structured_message).strip().lower()
+    raw = "\x1f".join([item_type, target_id, profile_version or "", normalized])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get_cached_response(cache_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up a cached response.
+
+    Args:
+        cache_key: Key from make_cache_key
+
+    Returns:
+        Response dict (marked with "cached": True) or None on a miss
+    """
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            now = time.time()
+
+            cursor.execute("""
+                SELECT content, total_tokens FROM responses
+                WHERE cache_key = ? AND created_at >= ?
+            """, (cache_key, now - RESPONSE_CACHE_TTL))
+            row = cursor.fetchone()
+
+            if row:
+                cursor.execute(
+                    "UPDATE responses SET last_used_at = ? WHERE cache_key = ?",
+                    (now, cache_key),
+                )
+                conn.commit()
+
+        if row:
+            return {
+                "success": True,
+                "content": row["content"],
+                "total_tokens": row["total_tokens"],
+                "cached": True,
+            }
+        return None
+    except Exception as e:
+        print(f"Error reading response cache: {e}")
+        return None
+
+
+def store_response(cache_key: str, target_id: str, result: Dict[str, Any]) -> bool:
+    """
+    Store a successful response and evict expired / least recently used entries.
+
+    Args:
+        cache_key: Key from make_cache_key
+        target_id: The ID of the agent or team
+        result: Response dict from the run
+
+    Returns:
+        True if stored, False otherwise
+    """
+    if not result.get("success"):
+        return False
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            now = time.time()
+
+            cursor.execute("""
+                INSERT OR REPLACE INTO responses
+                    (cache_key, target_id, content, total_tokens, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (cache_key, target_id, result["content"], result.get("total_tokens", 0), now, now))
+
+            # TTL eviction
+            cursor.execute(
+                "DELETE FROM responses WHERE created_at < ?", (now - RESPONSE_CACHE_TTL,)
+            )
+            # LRU eviction beyond the size limit
+            cursor.execute("""
+                DELETE FROM responses WHERE cache_key IN (
+                    SELECT cache_key FROM responses
+                    ORDER BY last_used_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+            """, (RESPONSE_CACHE_MAX_ENTRIES,))
+
+            conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error writing response cache: {e}")
+        return False
+
+
+def clear_response_cache(target_id: Optional[str] = None) -> bool:
+    """
+    Remove cached responses.
+
+    Args:
+        target_id: Only clear this agent/team's entries (all entries if None)
+
+    Returns:
+        True if successful, False otherwise
+    """
+    if not os.path.exists(CACHE_DB_PATH):
+        # Never used; nothing to clear
+        return True
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+
+            if target_id is None:
+                cursor.execute("DELETE FROM responses")
+            else:
+                cursor.execute("DELETE FROM responses WHERE target_id = ?", (target_id,))
+
+            conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error clearing response cache: {e}")
+        return False
+
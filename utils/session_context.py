@@ -0,0 +1,127 @@
+"""
+Server-side session context helpers.
+In session context mode the backend session holds the conversation, so each
+turn only sends the new query plus whatever changed in the user profile.
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Set
+
+import requests
+
+from config.config import SESSION_ENDPOINT, SESSION_CHECK_TIMEOUT, SESSION_CHECK_TTL
+from utils.api_client import api_get
+
+# session_id -> monotonic time the backend last confirmed the session exists
+_confirmed: Dict[str, float] = {}
+_confirmed_lock = threading.Lock()
+
+
+def mark_session_confirmed(session_id: str):
+    """Record that the backend holds this session (e.g. after a successful run)."""
+    with _confirmed_lock:
+        _confirmed[session_id] = time.monotonic()
+
+
+def forget_session(session_id: str):
+    """Drop a session from the confirmation cache."""
+    with _confirmed_lock:
+        _confirmed.pop(session_id, None)
+
+
+def backend_session_exists(session_id: str, item_type: str) -> bool:
+    """
+    Check whether the backend still has a session.
+
+    Confirmations are cached for SESSION_CHECK_TTL seconds. Any failure
+    counts as a miss, since resending the full context is always safe.
+
+    Args:
+        session_id: The chat session ID sent with runs
+        item_type: Either "agent" or "team"
+
+    Returns:
+        True if the backend has the session, False otherwise
+    """
+    with _confirmed_lock:
+        confirmed_at = _confirmed.get(session_id)
+    if confirmed_at is not None and time.monotonic() - confirmed_at < SESSION_CHECK_TTL:
+        return True
+
+    try:
+        response = api_get(
+            SESSION_ENDPOINT.format(session_id=session_id),
+            params={"type": item_type},
+            timeout=SESSION_CHECK_TIMEOUT,
+            max_retries=0,
+        )
+        exists = response.status_code == 200
+    except requests.exceptions.RequestException:
+        exists = False
+
+    if exists:
+        mark_session_confirmed(session_id)
+    else:
+        forget_session(session_id)
+    return exists
+
+
+def _line_keys(line: str) -> Set[str]:
+    """
+    Field keys a formatted profile line carries.
+
+    "- Term Insurance: ₹50L" carries "- Term Insurance"; a compact
+    "insurance: life_cover=...; term_cover=..." line carries "insurance" plus
+    "insurance.life_cover" and "insurance.term_cover"; any other line
+    (section header, free text) is its own key.
+    """
+    stripped = line.strip()
+    if ":" not in stripped.rstrip(":"):
+        return {stripped}
+    head, rest = stripped.split(":", 1)
+    keys = {head}
+    for part in rest.split("; "):
+        if "=" in part:
+            keys.add(f"{head}.{part.split('=', 1)[0].strip()}")
+    return keys
+
+
+def profile_delta(old_text: str, new_text: str) -> Optional[str]:
+    """
+    Get the lines of a formatted profile that changed, under their section headers.
+
+    A delta can only add or overwrite fields, so when a field, section or
+    note present in the old text is gone from the new one (e.g. a cover set
+    to 0 is dropped by the compact encoding), None is returned and the
+    caller must resend the whole profile.
+
+    Args:
+        old_text: Profile text already sent in this session
+        new_text: Current profile text
+
+    Returns:
+        Changed lines grouped by section ("" if nothing changed), or None
+        if something was removed
+    """
+    old_keys = set().union(*(_line_keys(line) for line in old_text.splitlines() if line.strip()))
+    new_keys = set().union(*(_line_keys(line) for line in new_text.splitlines() if line.strip()))
+    if old_keys - new_keys:
+        return None
+
+    old_lines = set(old_text.splitlines())
+    delta = []
+    header = None
+    for line in new_text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if not stripped.startswith("-") and stripped.endswith(":"):
+            header = line
+            continue
+        if line not in old_lines:
+            if header is not None:
+                delta.append(header)
+                header = None
+            delta.append(line)
+    return "\n".join(delta)